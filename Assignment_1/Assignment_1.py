@@ -1,10 +1,19 @@
-# Lists to store usernames and their corresponding storage spaces
-usernames = []
-available_storage = []
+from account_store import DATABASE_PATH, AccountStore
+
+# Usernames and their available storage, indexed by username and kept in
+# accounts.db between runs (opened on first use by _store)
+accounts = None
+
+def _store():
+    # Return the account store, opening accounts.db the first time it is needed
+    global accounts
+    if accounts is None:
+        accounts = AccountStore(DATABASE_PATH)
+    return accounts
 
 def create_user_account(username, storage_space):
     # Validation for unique username and positive storage space
-    if not username or username in usernames:
+    if not username or username in _store():
         print("Invalid username. It must be unique and not blank.")
         return
     
@@ -17,14 +26,13 @@ def create_user_account(username, storage_space):
         print("Storage space must be a positive number.")
         return
     
-    # Adding the user details to the lists
-    usernames.append(username)
-    available_storage.append(storage_space)
+    # Adding the user details to the store
+    _store().create(username, storage_space)
     print(f"User account '{username}' created with {storage_space}MB of storage.")
 
 def upload_file(username, filename, filesize):
     # Check if user exists and has enough space
-    if username not in usernames:
+    if username not in _store():
         print("User not found.")
         return
     
@@ -33,32 +41,26 @@ def upload_file(username, filename, filesize):
         print("Filesize must be greater than 0MB.")
         return
     
-    # Get the index of the user in the lists
-    index = usernames.index(username)
-
-    # Check if the user has enough storage space
-    if available_storage[index] >= filesize:
-        available_storage[index] -= filesize
+    # Take the space from the user's storage if there is enough of it
+    remaining = _store().use_storage(username, filesize)
+    if remaining is not None:
         print(f"File '{filename}' uploaded successfully for user '{username}'.")
-        print(f"Remaining storage for '{username}': {available_storage[index]}MB")
+        print(f"Remaining storage for '{username}': {remaining}MB")
     else:
         print("Not enough storage space to upload this file.")
 
 def delete_user_account(username):
-    # Check if the user exists
-    if username not in usernames:
+    # Check if the user exists and remove it
+    if not _store().delete(username):
         print("User not found.")
         return
     
-    index = usernames.index(username)
-    usernames.pop(index)
-    available_storage.pop(index)
     print(f"User account '{username}' deleted successfully.")
 
 def display_accounts():
     print("\nCurrent User Accounts:")
-    for i in range(len(usernames)):
-        print(f"Username: {usernames[i]}, Available Storage: {available_storage[i]}MB")
+    for username, storage in _store():
+        print(f"Username: {username}, Available Storage: {storage}MB")
     print()
 
 def get_valid_integer(prompt):
@@ -73,6 +75,7 @@ def get_valid_integer(prompt):
             print("Invalid input. Please enter a valid numeric value.")
 
 def main():
+    global accounts
     running = True  # Flag to control the loop
 
     while running:
@@ -102,7 +105,7 @@ def main():
         elif choice == '3':
             username = input("Enter username: ")
             # Use an if-else structure to control the flow
-            if username in usernames:
+            if username in _store():
                 filename = input("Enter filename: ")
                 filesize = get_valid_integer("Enter filesize (in MB): ")
                 upload_file(username, filename, filesize)
@@ -115,6 +118,9 @@ def main():
         elif choice == '5':
             print("Exiting the program.")
             running = False  # Change flag to exit the loop
+            if accounts is not None:
+                accounts.close()
+                accounts = None
         
         else:
             print("Invalid option, please try again.")
@@ -0,0 +1,111 @@
+# Persistent storage for user accounts, backed by SQLite.
+# Accounts are looked up through the unique index on username, so finding,
+# updating and deleting an account does not scan the other accounts, and the
+# accounts survive restarts of the program.
+
+import sqlite3
+from contextlib import contextmanager
+
+# Default database file, in the directory the program is run from
+DATABASE_PATH = "accounts.db"
+
+# UPDATE ... RETURNING needs SQLite 3.35 or newer
+RETURNING_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    available_storage INTEGER NOT NULL
+)
+"""
+
+class AccountStore:
+    # Maps usernames to their available storage (in MB).
+
+    def __init__(self, path=DATABASE_PATH):
+        self.connection = sqlite3.connect(path)
+        # WAL with synchronous=NORMAL keeps every committed change on disk
+        # without an fsync per operation
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        # 64 MB page cache, enough to keep the username index of a million
+        # accounts in memory
+        self.connection.execute("PRAGMA cache_size=-65536")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+        self.in_bulk = False
+
+    def close(self):
+        self.connection.close()
+
+    def commit(self):
+        # Commit after each change, unless inside bulk()
+        if not self.in_bulk:
+            self.connection.commit()
+
+    @contextmanager
+    def bulk(self):
+        # Group many changes into one transaction (committed at the end, or
+        # rolled back if an exception is raised).
+        self.in_bulk = True
+        try:
+            yield self
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        finally:
+            self.in_bulk = False
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def __contains__(self, username):
+        return self.get_storage(username) is not None
+
+    def __iter__(self):
+        # (username, available storage) pairs in the order the accounts were created
+        return iter(self.connection.execute("SELECT username, available_storage FROM accounts ORDER BY id"))
+
+    def get_storage(self, username):
+        # Return the available storage of a user, or None if there is no such user
+        row = self.connection.execute(
+            "SELECT available_storage FROM accounts WHERE username = ?", (username,)).fetchone()
+        return None if row is None else row[0]
+
+    def create(self, username, storage_space):
+        # Add an account; returns False if the username is already taken
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO accounts (username, available_storage) VALUES (?, ?)",
+            (username, storage_space))
+        self.commit()
+        return cursor.rowcount == 1
+
+    def use_storage(self, username, filesize):
+        # Take filesize MB from a user's storage if there is enough of it.
+        # Returns the remaining storage, or None if the user does not exist
+        # or does not have enough space.
+        if RETURNING_SUPPORTED:
+            rows = self.connection.execute(
+                "UPDATE accounts SET available_storage = available_storage - ? "
+                "WHERE username = ? AND available_storage >= ? RETURNING available_storage",
+                (filesize, username, filesize)).fetchall()
+            self.commit()
+            return rows[0][0] if rows else None
+
+        # Older SQLite: read the new value back in the same transaction,
+        # before any other connection can change it
+        cursor = self.connection.execute(
+            "UPDATE accounts SET available_storage = available_storage - ? "
+            "WHERE username = ? AND available_storage >= ?",
+            (filesize, username, filesize))
+        remaining = self.get_storage(username) if cursor.rowcount == 1 else None
+        self.commit()
+        return remaining
+
+    def delete(self, username):
+        # Remove an account; returns False if there is no such user
+        cursor = self.connection.execute("DELETE FROM accounts WHERE username = ?", (username,))
+        self.commit()
+        return cursor.rowcount == 1
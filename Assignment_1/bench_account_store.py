@@ -0,0 +1,125 @@
+# Benchmarks create, upload and delete throughput of the account store.
+#
+# Usage:
+#     python bench_account_store.py                      # 1,000,000 accounts
+#     python bench_account_store.py --accounts 100000 --list-accounts 20000
+#
+# The store is timed at the full account count, with all operations of a
+# phase in one transaction and again with a commit after every operation.
+# The original parallel-list implementation is timed at a smaller count,
+# since every operation on it scans the lists.
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from account_store import AccountStore
+
+def usernames_for(count):
+    return [f"user{i}" for i in range(count)]
+
+def rate(count, seconds):
+    return f"{count / seconds:>12,.0f} ops/s  ({seconds:.2f} s)"
+
+def run_phases(phases, count):
+    # Time each (name, function) phase and print its throughput
+    for name, phase in phases:
+        start = time.perf_counter()
+        phase()
+        print(f"  {name:<8}{rate(count, time.perf_counter() - start)}")
+
+def bench_store(count, path):
+    # Create, upload to and delete `count` accounts in a single transaction
+    # per phase, looking accounts up in random order.
+    store = AccountStore(path)
+    names = usernames_for(count)
+    shuffled = names[:]
+    random.shuffle(shuffled)
+
+    def create():
+        with store.bulk():
+            for name in names:
+                store.create(name, 1000)
+
+    def upload():
+        with store.bulk():
+            for name in shuffled:
+                store.use_storage(name, 10)
+
+    def delete():
+        with store.bulk():
+            for name in shuffled:
+                store.delete(name)
+
+    print(f"AccountStore, {count:,} accounts (one transaction per phase):")
+    run_phases([("create", create), ("upload", upload), ("delete", delete)], count)
+    store.close()
+
+def bench_store_commits(count, sample, path):
+    # Time `sample` individually committed operations on a store that
+    # already holds `count` accounts.
+    store = AccountStore(path)
+    with store.bulk():
+        for name in usernames_for(count):
+            store.create(name, 1000)
+    names = random.sample(usernames_for(count), sample)
+    extra = [f"new{i}" for i in range(sample)]
+
+    print(f"AccountStore, {sample:,} operations on {count:,} accounts (commit per operation):")
+    run_phases([
+        ("create", lambda: [store.create(name, 1000) for name in extra]),
+        ("upload", lambda: [store.use_storage(name, 10) for name in names]),
+        ("delete", lambda: [store.delete(name) for name in names]),
+    ], sample)
+    store.close()
+
+def bench_lists(count):
+    # The original implementation: parallel lists searched with `in` and index().
+    usernames = []
+    available_storage = []
+    names = usernames_for(count)
+    shuffled = names[:]
+    random.shuffle(shuffled)
+
+    def create():
+        for name in names:
+            if name not in usernames:
+                usernames.append(name)
+                available_storage.append(1000)
+
+    def upload():
+        for name in shuffled:
+            if name in usernames:
+                available_storage[usernames.index(name)] -= 10
+
+    def delete():
+        for name in shuffled:
+            if name in usernames:
+                index = usernames.index(name)
+                usernames.pop(index)
+                available_storage.pop(index)
+
+    print(f"Parallel lists, {count:,} accounts:")
+    run_phases([("create", create), ("upload", upload), ("delete", delete)], count)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the account store")
+    parser.add_argument("--accounts", type=int, default=1_000_000)
+    parser.add_argument("--commit-sample", type=int, default=10_000,
+                        help="Operations timed with a commit after each one")
+    parser.add_argument("--list-accounts", type=int, default=10_000,
+                        help="Accounts for the parallel-list baseline (0 to skip)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        bench_store(args.accounts, os.path.join(directory, "bulk.db"))
+        bench_store_commits(args.accounts, min(args.commit_sample, args.accounts),
+                            os.path.join(directory, "commits.db"))
+    if args.list_accounts:
+        bench_lists(args.list_accounts)
+
+if __name__ == "__main__":
+    main()
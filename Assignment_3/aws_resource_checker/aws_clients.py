@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+
+from metrics import METRICS
+
+# Attempts per call made by botocore's adaptive retry mode, which backs off
+# with jitter and slows its own send rate when AWS starts throttling
+MAX_ATTEMPTS = 10
+
+# Default sustained calls per second allowed for each API operation
+DEFAULT_RATE_LIMITS = {
+    "ec2": 20,
+    "s3": 100,
+}
+
+# Error codes AWS uses for throttling; these are retried, never reported as findings
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "SlowDown",
+}
+
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average, with bursts of up to
+    `capacity` calls. acquire() blocks until a call is allowed. The
+    capacity is at least one call, so rates below 1 per second still work.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = max(1.0, capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class ClientRateLimiter:
+    """
+    Keeps one TokenBucket per API operation of a client and waits on it
+    before every call, via botocore's before-call event.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, operation_name):
+        with self.lock:
+            if operation_name not in self.buckets:
+                self.buckets[operation_name] = TokenBucket(self.rate)
+            return self.buckets[operation_name]
+
+    def before_call(self, model, **kwargs):
+        self.bucket_for(model.name).acquire()
+
+def create_client(service_name, max_pool_connections=10, region_name=None, rate_limit=None):
+    """
+    Creates a boto3 client whose connection pool is large enough to be
+    shared by max_pool_connections worker threads. Calls use adaptive
+    retries and are limited to rate_limit calls per second per API
+    operation (DEFAULT_RATE_LIMITS for the service if None, 0 for no limit).
+    Every call is recorded in METRICS.
+    """
+    # boto3 takes longer to import than the rest of the CLI put together,
+    # so it is only loaded once a client is actually needed
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        retries={"mode": "adaptive", "max_attempts": MAX_ATTEMPTS}
+    )
+    client = boto3.client(service_name, region_name=region_name, config=config)
+
+    # The limiter is registered before the metrics hooks, so time spent
+    # waiting for a token is never counted as API latency
+    if rate_limit is None:
+        rate_limit = DEFAULT_RATE_LIMITS.get(service_name, 0)
+    if rate_limit:
+        limiter = ClientRateLimiter(rate_limit)
+        client.meta.events.register(f"before-call.{client.meta.service_model.service_id.hyphenize()}.*", limiter.before_call)
+    METRICS.attach(client)
+    return client
+
+def error_code(error):
+    # The AWS error code of a botocore ClientError (None for other errors),
+    # read from its response without importing botocore
+    response = getattr(error, "response", None)
+    return response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+
+def is_throttling_error(error):
+    return error_code(error) in THROTTLING_ERROR_CODES
+
+def call_with_backoff(method, *args, attempts=5, base_delay=0.5, max_delay=20.0, **kwargs):
+    """
+    Calls method, retrying throttling errors that outlast botocore's own
+    retries with exponential backoff and full jitter. Any other error, or
+    throttling on the last attempt, is raised to the caller.
+    """
+    for attempt in range(attempts):
+        try:
+            return method(*args, **kwargs)
+        except Exception as e:
+            if not is_throttling_error(e) or attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
@@ -0,0 +1,69 @@
+"""
+Benchmarks compliance rule extraction: the full-tree <li> parser against
+the targeted rule-link parser.
+
+Usage (from aws_resource_checker/):
+    python benchmarks/bench_rule_parsing.py ec2 saved_ec2_page.html
+    python benchmarks/bench_rule_parsing.py s3
+
+Pass pages saved from the knowledge base to measure real input. With no
+file, a synthetic page with the same shape (site navigation, a rule list
+and a footer) is generated instead.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliance_rules import KB_URLS, html_parser, parse_rules, parse_rules_full
+
+def build_synthetic_page(service, rule_count=400, nav_count=300):
+    """
+    Builds a page with navigation lists around a list of rule links.
+    """
+    kb_path = KB_URLS[service].split("trendmicro.com")[1]
+    nav = "".join(f'<li><a href="/section/{i}.html">Navigation item {i}</a></li>' for i in range(nav_count))
+    rules = "".join(
+        f'<li class="rule"><a href="{kb_path}rule-{i}.html">{service.upper()} rule {i}</a>'
+        f'<p>Summary text for rule {i}.</p></li>'
+        for i in range(rule_count)
+    )
+    return (
+        f"<html><head><title>Knowledge Base</title></head><body>"
+        f"<nav><ul>{nav}</ul></nav><main><ul class=\"rules\">{rules}</ul></main>"
+        f"<footer><ul>{nav}</ul></footer></body></html>"
+    )
+
+def benchmark(service, html, label, repeat=5):
+    full_time = min(timeit.repeat(lambda: parse_rules_full(html), number=1, repeat=repeat))
+    targeted_time = min(timeit.repeat(lambda: parse_rules(html, service), number=1, repeat=repeat))
+
+    full_titles = [rule["title"] for rule in parse_rules_full(html)]
+    targeted = parse_rules(html, service)
+    # Each targeted rule must appear in some <li> of the full parse (no invented rules);
+    # the full parse also keeps any text that follows the link inside the <li>
+    missing = [rule["title"] for rule in targeted
+               if not any(rule["title"] in title for title in full_titles)]
+
+    print(f"{label} ({len(html) / 1024:.0f} KB)")
+    print(f"  full <li> parse:    {full_time * 1000:8.1f} ms, {len(full_titles)} entries")
+    print(f"  targeted rule links:{targeted_time * 1000:8.1f} ms, {len(targeted)} rules ({html_parser()})")
+    print(f"  speedup: {full_time / targeted_time:.1f}x, rules absent from full parse: {len(missing)}")
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in KB_URLS:
+        print(__doc__)
+        sys.exit(1)
+
+    service = sys.argv[1]
+    paths = sys.argv[2:]
+    if not paths:
+        benchmark(service, build_synthetic_page(service), "synthetic page")
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as file:
+            benchmark(service, file.read(), path)
+
+if __name__ == "__main__":
+    main()
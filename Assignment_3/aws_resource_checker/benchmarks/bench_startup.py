@@ -0,0 +1,73 @@
+"""
+Benchmarks how long the CLI takes to start, using python -X importtime.
+
+Usage (from aws_resource_checker/):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --top 15
+
+Reports the median wall time of `main.py --help` next to a bare
+interpreter, the import time of main and its slowest imports, and exits
+with status 1 if starting the CLI loads a heavy dependency (boto3,
+botocore, requests or bs4), so it can run as a CI check.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHECKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that must only be imported once they are actually used
+HEAVY_MODULES = ["boto3", "botocore", "requests", "bs4"]
+
+def wall_time(command, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=CHECKER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def import_times(module):
+    """
+    Returns {module: (self_us, cumulative_us)} for every module imported
+    by `import module`, as reported by -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=CHECKER_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    baseline = wall_time([sys.executable, "-c", "pass"], args.runs)
+    help_time = wall_time([sys.executable, "main.py", "--help"], args.runs)
+    print(f"python -c pass:      {baseline * 1000:8.1f} ms (median of {args.runs})")
+    print(f"python main.py -h:   {help_time * 1000:8.1f} ms ({(help_time - baseline) * 1000:.1f} ms over the interpreter)")
+
+    times = import_times("main")
+    print(f"import main:         {times['main'][1] / 1000:8.1f} ms cumulative")
+    print("slowest imports (cumulative):")
+    for name, (_, cumulative_us) in sorted(times.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"    {name:<36}{cumulative_us / 1000:8.1f} ms")
+
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    if loaded:
+        print(f"heavy dependencies imported at startup: {', '.join(loaded)}")
+        sys.exit(1)
+    print("no heavy dependencies imported at startup")
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,194 @@
-import requests
-from bs4 import BeautifulSoup
+import json
+import os
+import re
+import time
+
 from utils import log_message
+from metrics import timed
+
+# requests, BeautifulSoup and lxml are imported by the functions that use
+# them, so runs served from the rules cache never load them
 
-def fetch_compliance_rules(service):
+def html_parser():
     """
-    Fetches compliance rules dynamically for the given AWS service.
-    Falls back to static rules if scraping fails.
+    Returns the fastest BeautifulSoup parser available: lxml if installed.
+    """
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+KB_URLS = {
+    "s3": "https://www.trendmicro.com/cloudoneconformity/knowledge-base/aws/S3/",
+    "ec2": "https://www.trendmicro.com/cloudoneconformity/knowledge-base/aws/EC2/"
+}
+
+RULE_DESCRIPTION = "Refer to AWS documentation for details."
+
+# Directory holding the last good copy of each service's rules
+CACHE_DIR = "cache"
+
+# Bumped whenever the shape of cached rules changes, so old caches are refetched
+CACHE_VERSION = 2
+
+# Cached rules younger than this (in seconds) are used without any request
+DEFAULT_TTL = 24 * 60 * 60
+
+# Seconds to wait for the knowledge-base page before giving up
+REQUEST_TIMEOUT = 15
+
+def get_cache_path(service, cache_dir=CACHE_DIR):
+    """
+    Returns the cache file path for a service's rules.
+    """
+    return os.path.join(cache_dir, f"{service}_rules.json")
+
+def load_cached_rules(service, cache_dir=CACHE_DIR):
+    """
+    Loads the cached rules entry for a service, or None if there is none.
+    """
+    try:
+        with open(get_cache_path(service, cache_dir), "r") as file:
+            entry = json.load(file)
+        if entry.get("version") != CACHE_VERSION:
+            return None
+        return entry
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log_message(f"Ignoring unreadable rules cache for {service}: {e}", level="WARNING")
+        return None
+
+def save_cached_rules(service, entry, cache_dir=CACHE_DIR):
+    """
+    Writes a rules cache entry atomically so a crash never leaves a partial file.
+    """
+    filepath = get_cache_path(service, cache_dir)
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    try:
+        temp_path = filepath + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(entry, file)
+        os.replace(temp_path, filepath)
+    except Exception as e:
+        log_message(f"Failed to save rules cache for {service}: {e}", level="ERROR")
+
+def parse_rules_full(html):
+    """
+    Extracts rules by building the whole document tree and taking the text
+    of every <li>. Kept as the reference the targeted parser is benchmarked
+    against; it also picks up navigation and footer items.
     """
-    urls = {
-        "s3": "https://www.trendmicro.com/cloudoneconformity/knowledge-base/aws/S3/",
-        "ec2": "https://www.trendmicro.com/cloudoneconformity/knowledge-base/aws/EC2/"
-    }
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    rules = []
+    for rule in soup.find_all("li"):
+        title = rule.get_text(strip=True)
+        if title:
+            rules.append({
+                "title": title,
+                "description": RULE_DESCRIPTION
+            })
+    return rules
+
+def parse_rules(html, service):
+    """
+    Extracts rules from a knowledge-base page by parsing only the links that
+    point at the service's rule pages (".../aws/EC2/<rule>.html"). Everything
+    else on the page is skipped by the SoupStrainer, so no full tree is built.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    kb_path = KB_URLS[service].split("/knowledge-base/")[1]
+    rule_link = re.compile(re.escape(kb_path) + r"([^/?#]+)\.html")
+    only_rule_links = SoupStrainer("a", href=rule_link)
+    soup = BeautifulSoup(html, html_parser(), parse_only=only_rule_links)
+
+    rules = []
+    seen = set()
+    for link in soup.find_all("a"):
+        rule_id = rule_link.search(link["href"]).group(1)
+        title = link.get_text(" ", strip=True)
+        if title and rule_id not in seen:
+            seen.add(rule_id)
+            rules.append({
+                "id": rule_id,
+                "title": title,
+                "description": RULE_DESCRIPTION
+            })
+    return rules
 
-    if service not in urls:
+@timed("fetch_compliance_rules")
+def fetch_compliance_rules(service, ttl=DEFAULT_TTL, offline=False, cache_dir=CACHE_DIR):
+    """
+    Fetches compliance rules dynamically for the given AWS service.
+    Rules are cached on disk per service: a copy younger than `ttl` seconds
+    is used as-is, an older one is revalidated with ETag/Last-Modified, and
+    the last good copy is served when offline or when the fetch fails or
+    returns a page with no rules.
+    """
+    if service not in KB_URLS:
         log_message(f"No compliance rules URL for service: {service}", level="ERROR")
         return []
 
+    cached = load_cached_rules(service, cache_dir)
+
+    if offline:
+        if cached:
+            log_message(f"Offline mode: using {len(cached['rules'])} cached compliance rules for {service}.")
+            return cached["rules"]
+        log_message(f"Offline mode: no cached compliance rules for {service}.", level="ERROR")
+        return []
+
+    if cached and time.time() - cached.get("fetched_at", 0) < ttl:
+        log_message(f"Using {len(cached['rules'])} cached compliance rules for {service}.")
+        return cached["rules"]
+
+    import requests
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
     try:
-        log_message(f"Fetching compliance rules for {service} from {urls[service]}...")
-        response = requests.get(urls[service], headers={"User-Agent": "Mozilla/5.0"})
+        log_message(f"Fetching compliance rules for {service} from {KB_URLS[service]}...")
+        response = requests.get(KB_URLS[service], headers=headers, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code == 304 and cached:
+            log_message(f"Compliance rules for {service} are unchanged; refreshing cache.")
+            cached["fetched_at"] = time.time()
+            save_cached_rules(service, cached, cache_dir)
+            return cached["rules"]
+
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Extract compliance rules for S3 based on the provided content structure
-        rules = []
-        for rule in soup.find_all("li"):
-            title = rule.get_text(strip=True)
-            if title:
-                rules.append({
-                    "title": title,
-                    "description": "Refer to AWS documentation for details."
-                })
+        rules = parse_rules(response.text, service)
+        if not rules:
+            log_message(f"No rule links found on the {service} page; falling back to full parse.", level="WARNING")
+            rules = parse_rules_full(response.text)
+        if not rules:
+            # A page without rules is a broken or changed page, not an empty
+            # rule set; keep the cache and fall back to it below
+            raise ValueError("no compliance rules found on the page")
 
         log_message(f"Fetched {len(rules)} compliance rules for {service}.")
+        save_cached_rules(service, {
+            "version": CACHE_VERSION,
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "rules": rules
+        }, cache_dir)
         return rules
     except Exception as e:
+        if cached:
+            log_message(f"Failed to fetch compliance rules for {service}: {e}. Using last cached copy.", level="WARNING")
+            return cached["rules"]
         log_message(f"Failed to fetch compliance rules for {service}: {e}", level="ERROR")
         return []
@@ -0,0 +1,13 @@
+import argparse
+from utils import convert_report
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a JSON Lines compliance report to the pretty JSON format")
+    parser.add_argument("source", help="Report written with --report-format jsonl or jsonl.gz")
+    parser.add_argument("destination", help="Path of the JSON report to write")
+    args = parser.parse_args()
+
+    convert_report(args.source, args.destination)
+
+if __name__ == "__main__":
+    main()
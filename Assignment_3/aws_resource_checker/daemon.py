@@ -0,0 +1,282 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from utils import log_message
+from compliance_rules import fetch_compliance_rules, DEFAULT_TTL
+from aws_clients import create_client
+from ec2_checker import check_ec2_compliance
+from s3_checker import check_s3_compliance, DEFAULT_WORKERS
+from orchestrator import GLOBAL_REGION
+from metrics import METRICS
+from defaults import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_AGE
+
+class AuditService:
+    """
+    Keeps AWS clients and compliance rules in memory between audits, so
+    each run only pays for the AWS calls it makes. The latest result of
+    every audit (one per service and region) is kept and returned for
+    requests that arrive within max_age seconds of it.
+    """
+
+    def __init__(self, services, regions=None, workers=DEFAULT_WORKERS, rules_ttl=DEFAULT_TTL,
+                 offline=False, max_age=DEFAULT_MAX_AGE, audit_options=None):
+        self.services = services
+        self.regions = regions or [None]
+        self.workers = workers
+        self.rules_ttl = rules_ttl
+        self.offline = offline
+        self.max_age = max_age
+        self.audit_options = audit_options or {}
+        self.clients = {}
+        self.rules = {}
+        self.results = {}
+        self.audit_locks = {}
+        self.lock = threading.Lock()
+        # Held while rules are fetched, which can take seconds, so that
+        # /results and client lookups never wait on the knowledge base
+        self.rules_lock = threading.Lock()
+
+    def audits(self):
+        """
+        Returns the (service, region) pair of every audit this service runs.
+        """
+        pairs = []
+        if "ec2" in self.services:
+            pairs.extend(("ec2", region) for region in self.regions)
+        if "s3" in self.services:
+            pairs.append(("s3", GLOBAL_REGION))
+        return pairs
+
+    def client(self, service, region):
+        with self.lock:
+            key = (service, region)
+            if key not in self.clients:
+                if service == "s3":
+                    self.clients[key] = create_client("s3", max_pool_connections=self.workers,
+                                                      rate_limit=self.audit_options.get("rate_limit"))
+                else:
+                    self.clients[key] = create_client("ec2", region_name=region,
+                                                      rate_limit=self.audit_options.get("rate_limit"))
+            return self.clients[key]
+
+    def compliance_rules(self, service):
+        """
+        Returns the rules for a service, fetching them again (through the
+        on-disk cache) once they are older than rules_ttl.
+        """
+        with self.rules_lock:
+            fetched_at, rules = self.rules.get(service, (0, None))
+            if rules and time.time() - fetched_at < self.rules_ttl:
+                return rules
+            rules = fetch_compliance_rules(service, ttl=self.rules_ttl, offline=self.offline)
+            if rules:
+                self.rules[service] = (time.time(), rules)
+            return rules
+
+    def run(self, service, region=None, max_age=None):
+        """
+        Returns the result of an audit, running it unless a result younger
+        than max_age seconds (the service default if None) is cached.
+        Concurrent requests for the same audit share a single run.
+        """
+        if service == "s3":
+            region = GLOBAL_REGION
+        key = (service, region)
+        max_age = self.max_age if max_age is None else max_age
+        with self.lock:
+            audit_lock = self.audit_locks.setdefault(key, threading.Lock())
+
+        with audit_lock:
+            cached = self.results.get(key)
+            if cached is not None and time.time() - cached["Finished"] < max_age:
+                return dict(cached, Cached=True)
+
+            log_message(f"Running {service.upper()} audit for {region or 'the default region'}...")
+            start = time.time()
+            options = {
+                "compliance_rules": self.compliance_rules(service),
+                "report_path": None,
+                "enabled_rules": self.audit_options.get("enabled_rules"),
+                "incremental": self.audit_options.get("incremental", False),
+            }
+            if service == "s3":
+                findings = check_s3_compliance(workers=self.workers, s3=self.client(service, region), **options)
+            else:
+                findings = check_ec2_compliance(region=region, ec2=self.client(service, region),
+                                                filters=self.audit_options.get("instance_filters"), **options)
+
+            result = {
+                "Service": service,
+                "Region": region or "default",
+                "Started": start,
+                "Finished": time.time(),
+                "Completed": findings is not None,
+                "Findings": findings or [],
+            }
+            # A failed run does not replace the last good result
+            if findings is not None or cached is None:
+                self.results[key] = result
+            return dict(result, Cached=False)
+
+    def run_all(self, max_age=None):
+        results = []
+        for service, region in self.audits():
+            try:
+                results.append(self.run(service, region, max_age))
+            except Exception as e:
+                log_message(f"{service.upper()} audit in {region or 'the default region'} failed: {e}", level="ERROR")
+        return results
+
+    def cached_results(self):
+        with self.lock:
+            return list(self.results.values())
+
+    def find_resource(self, resource_id):
+        """
+        Returns the cached findings that mention resource_id.
+        """
+        return [
+            dict(finding, Service=result["Service"], Region=result["Region"], Checked=result["Finished"])
+            for result in self.cached_results()
+            for finding in result["Findings"]
+            if resource_id in (finding.get("InstanceId"), finding.get("BucketName"))
+        ]
+
+class Scheduler(threading.Thread):
+    """
+    Runs every audit of an AuditService each `interval` seconds, starting
+    immediately, until stop() is called.
+    """
+
+    def __init__(self, audit_service, interval):
+        super().__init__(name="audit-scheduler", daemon=True)
+        self.audit_service = audit_service
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            # max_age=0 so a scheduled run never returns a cached result
+            self.audit_service.run_all(max_age=0)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+
+class AuditRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health                    -- liveness check
+    GET  /results[?resource=ID]     -- cached results, or the cached findings for one resource
+    GET  /metrics                   -- API call and rule timings since the service started
+    POST /audit?service=S[&region=R][&max_age=N]
+                                    -- runs an audit (or every audit if service is omitted)
+                                       unless a result younger than max_age seconds is cached
+    """
+
+    audit_service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/health":
+            self.send_json(200, {"Status": "ok"})
+        elif url.path == "/results":
+            if "resource" in query:
+                self.send_json(200, self.audit_service.find_resource(query["resource"][0]))
+            else:
+                self.send_json(200, self.audit_service.cached_results())
+        elif url.path == "/metrics":
+            self.send_json(200, METRICS.to_dict())
+        else:
+            self.send_json(404, {"Error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path != "/audit":
+            self.send_json(404, {"Error": f"Unknown path {url.path}"})
+            return
+
+        try:
+            max_age = float(query["max_age"][0]) if "max_age" in query else None
+        except ValueError:
+            self.send_json(400, {"Error": "max_age must be a number of seconds"})
+            return
+
+        if "service" not in query:
+            self.send_json(200, self.audit_service.run_all(max_age))
+            return
+        service = query["service"][0]
+        region = query.get("region", [None])[0]
+        if (service, GLOBAL_REGION if service == "s3" else region) not in self.audit_service.audits():
+            self.send_json(400, {"Error": f"This service does not audit {service} in {region or 'the default region'}"})
+            return
+        self.send_json(200, self.audit_service.run(service, region, max_age))
+
+    def send_json(self, status, body):
+        data = json.dumps(body, indent=4, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        log_message(f"{self.address_string()} {format % args}")
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        # HTTPServer.server_bind expects a (host, port) address
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = self.server_address
+        self.server_port = 0
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+def serve(audit_service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, interval=None):
+    """
+    Serves audit requests over HTTP on host:port, or on unix_socket if
+    given, until interrupted. With an interval, every audit also runs on
+    that schedule in the background.
+    """
+    handler = type("Handler", (AuditRequestHandler,), {"audit_service": audit_service})
+    if unix_socket:
+        server = UnixHTTPServer(unix_socket, handler)
+        log_message(f"Serving compliance audits on unix socket {unix_socket}")
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        # server_port is the port actually bound, which port 0 leaves to the OS
+        log_message(f"Serving compliance audits on http://{host}:{server.server_port}")
+
+    scheduler = None
+    if interval:
+        scheduler = Scheduler(audit_service, interval)
+        scheduler.start()
+        log_message(f"Running every audit every {interval} seconds.")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log_message("Shutting down.")
+    finally:
+        if scheduler is not None:
+            scheduler.stop()
+        server.server_close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
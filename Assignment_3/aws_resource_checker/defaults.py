@@ -0,0 +1,23 @@
+# Defaults shared by main.py and the modules it runs. This module imports
+# nothing, so main.py can build its options from it without loading the
+# checkers or the daemon (see benchmarks/bench_startup.py).
+
+# Default number of S3 buckets checked concurrently
+DEFAULT_WORKERS = 8
+
+INSTANCE_STATES = ["pending", "running", "shutting-down", "terminated", "stopping", "stopped"]
+
+# Terminated instances cannot be fixed, so they are not audited by default
+DEFAULT_INSTANCE_STATES = ["pending", "running", "stopping", "stopped"]
+
+# IDs of the rules in ec2_checker.EC2_RULES and s3_checker.S3_RULES, for
+# the --rules choices; keep them in the same order as the rule lists
+EC2_RULE_IDS = ["ec2-approved-ami", "ec2-unrestricted-security-group", "ec2-key-pair", "ec2-name-tag"]
+S3_RULE_IDS = ["s3-block-public-access", "s3-encryption", "s3-versioning", "s3-logging",
+               "s3-mfa-delete", "s3-cross-account-access"]
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Audit results younger than this are returned without calling AWS again
+DEFAULT_MAX_AGE = 300
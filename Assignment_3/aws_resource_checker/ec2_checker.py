@@ -1,75 +1,240 @@
-import boto3
 from utils import log_message, save_report
-from compliance_rules import fetch_compliance_rules
+from compliance_rules import fetch_compliance_rules, DEFAULT_TTL
+from security_groups import SecurityGroupIndex
+from aws_clients import create_client
+from incremental import IncrementalState, evaluate_incrementally, fingerprint
+from metrics import timed
+from rule_engine import Rule, select_rules, required_data, evaluate, match_kb_rules
+from defaults import INSTANCE_STATES, DEFAULT_INSTANCE_STATES
 
-def check_ec2_compliance():
+REPORT_PATH = "reports/ec2_compliance_report.json"
+
+# Number of reservations requested per describe_instances page
+PAGE_SIZE = 500
+
+# EC2 accepts at most this many values per filter
+MAX_FILTER_VALUES = 200
+
+# The instance fields kept after each page is received; everything else in
+# the describe_instances response is dropped before the checks run
+INSTANCE_FIELDS = ["InstanceId", "ImageId", "KeyName", "Tags", "SecurityGroups", "State", "VpcId"]
+
+def build_instance_filters(states=DEFAULT_INSTANCE_STATES, tags=None, vpc_ids=None, instance_ids=None):
+    """
+    Builds describe_instances Filters so the selection happens on the AWS
+    side. tags is a {key: value} dict. Instance IDs are sent as a filter
+    rather than InstanceIds, which cannot be combined with paging.
+    """
+    filters = []
+    if states:
+        filters.append({"Name": "instance-state-name", "Values": list(states)})
+    for key, value in (tags or {}).items():
+        filters.append({"Name": f"tag:{key}", "Values": [value]})
+    if vpc_ids:
+        filters.append({"Name": "vpc-id", "Values": list(vpc_ids)})
+    if instance_ids:
+        filters.append({"Name": "instance-id", "Values": list(instance_ids)})
+    return filters
+
+def split_filters(filters):
+    """
+    Splits Filters with more than MAX_FILTER_VALUES values into filter sets
+    EC2 accepts, one describe_instances call each. The chunks of a filter
+    do not overlap, so every instance matches exactly one set.
+    """
+    filter_sets = [[]]
+    for instance_filter in filters:
+        values = list(dict.fromkeys(instance_filter["Values"]))
+        chunks = [values[start:start + MAX_FILTER_VALUES] for start in range(0, len(values) or 1, MAX_FILTER_VALUES)]
+        filter_sets = [filter_set + [{"Name": instance_filter["Name"], "Values": chunk}]
+                       for filter_set in filter_sets for chunk in chunks]
+    return filter_sets
+
+def project_instance(instance):
+    return {field: instance[field] for field in INSTANCE_FIELDS if field in instance}
+
+def iter_instance_pages(ec2, page_size=PAGE_SIZE, filters=None):
+    """
+    Yields the EC2 instances of each describe_instances page as a list.
+    Uses the boto3 paginator so NextToken is followed and only one page
+    of reservations is held in memory at a time. Filters are applied by
+    EC2 (split into several calls if a filter has more than
+    MAX_FILTER_VALUES values), and each instance is reduced to
+    INSTANCE_FIELDS.
+    """
+    paginator = ec2.get_paginator("describe_instances")
+    for filter_set in split_filters(filters or []):
+        for page in paginator.paginate(Filters=filter_set, PaginationConfig={"PageSize": page_size}):
+            instances = []
+            for reservation in page.get("Reservations", []):
+                instances.extend(project_instance(instance) for instance in reservation.get("Instances", []))
+            yield instances
+
+def iter_ec2_instances(ec2, page_size=PAGE_SIZE, filters=None):
+    """
+    Yields every EC2 instance in the region, one at a time.
+    """
+    for instances in iter_instance_pages(ec2, page_size, filters):
+        yield from instances
+
+# 1. Check for the use of recommended AMIs
+def check_recommended_ami(instance, context):
+    ami_id = instance.get("ImageId", "")
+    if ami_id != "ami-xxxxxxxxxxxxxxxxx":  # Replace with actual recommended AMI ID
+        return [f"Instance {instance['InstanceId']} is not using the recommended AMI."]
+    return []
+
+# 2. Check Security Groups (Ensure no unrestricted access)
+def check_unrestricted_security_groups(instance, context):
+    instance_id = instance["InstanceId"]
+    security_groups = context["security_groups"]
+    issues = []
+    for security_group in instance.get("SecurityGroups", []):
+        sg_id = security_group["GroupId"]
+        sg = security_groups.get(sg_id)
+        if sg is None:
+            log_message(f"Failed to check security group {sg_id} for instance {instance_id}", level="ERROR")
+        elif sg["OpenIpv4"] or sg["OpenIpv6"]:
+            issues.append(f"Instance {instance_id} has unrestricted access in security group {sg_id}.")
+    return issues
+
+# 3. Verify EC2 Key Pair
+def check_key_pair(instance, context):
+    if not instance.get("KeyName", ""):
+        return [f"Instance {instance['InstanceId']} does not have an associated key pair."]
+    return []
+
+# 4. Ensure Instances Are Properly Tagged
+def check_name_tag(instance, context):
+    tags = {tag["Key"]: tag["Value"] for tag in instance.get("Tags", [])}
+    if "Name" not in tags:
+        return [f"Instance {instance['InstanceId']} is not properly tagged with 'Name'."]
+    return []
+
+# Every instance field comes from describe_instances; "security_groups"
+# means the rule also needs describe_security_groups
+EC2_RULES = [
+    Rule("ec2-approved-ami", ["instance"], check_recommended_ami,
+         "Instances use the recommended AMI", kb_keywords=["AMI"]),
+    Rule("ec2-unrestricted-security-group", ["instance", "security_groups"], check_unrestricted_security_groups,
+         "Attached security groups are not open to 0.0.0.0/0 or ::/0", kb_keywords=["unrestricted"]),
+    Rule("ec2-key-pair", ["instance"], check_key_pair,
+         "Instances have an associated key pair", kb_keywords=["key pair"]),
+    Rule("ec2-name-tag", ["instance"], check_name_tag,
+         "Instances are tagged with 'Name'", kb_keywords=["tag"]),
+]
+
+def check_instances(instances, rules, security_groups=None):
+    """
+    Evaluates the rules over a batch of instances in one pass.
+    Returns one list of issues per instance.
+    """
+    for instance in instances:
+        log_message("Checking compliance for EC2 instance: %s", args=(instance["InstanceId"],), sampled=True)
+    return evaluate(rules, instances, {"security_groups": security_groups})
+
+def instance_fingerprint_data(instance, security_groups):
+    """
+    Returns the instance configuration the rules depend on, including the
+    attached security groups, for incremental change detection.
+    """
+    group_ids = sorted(security_group["GroupId"] for security_group in instance.get("SecurityGroups", []))
+    return {
+        "ImageId": instance.get("ImageId", ""),
+        "KeyName": instance.get("KeyName", ""),
+        "Tags": sorted((tag["Key"], tag["Value"]) for tag in instance.get("Tags", [])),
+        "SecurityGroups": [security_groups.groups.get(group_id, group_id) for group_id in group_ids],
+    }
+
+@timed("ec2_audit")
+def check_ec2_compliance(rules_ttl=DEFAULT_TTL, offline=False, region=None,
+                         compliance_rules=None, report_path=REPORT_PATH, enabled_rules=None,
+                         incremental=False, report_writer=None, ec2=None, rate_limit=None,
+                         filters=None):
     """
     Checks EC2 instance compliance against dynamically fetched rules.
+    Audits the given region (the default region if None). Rules already
+    fetched by the caller can be passed in, and report_path=None skips
+    writing the report. enabled_rules limits the audit to those rule IDs;
+    security groups are only described if an enabled rule needs them.
+    With incremental=True only instances whose configuration changed since
+    the previous run are re-evaluated, and a diff report is written.
+    If report_writer is given, findings are appended to it as they are
+    found and it is returned in place of the list. An existing EC2 client
+    (or a local stand-in from fake_aws) can be passed as ec2; otherwise one
+    is created with rate_limit calls per second per API. filters are
+    describe_instances Filters (see build_instance_filters; by default all
+    instances that are not terminated). Returns the non-compliant
+    instances, or None if the audit could not run.
     """
-    log_message("Fetching EC2 compliance rules...")
-    compliance_rules = fetch_compliance_rules("ec2")
+    if filters is None:
+        filters = build_instance_filters()
+
+    if compliance_rules is None:
+        log_message("Fetching EC2 compliance rules...")
+        compliance_rules = fetch_compliance_rules("ec2", ttl=rules_ttl, offline=offline)
 
     if not compliance_rules:
         log_message("No compliance rules available for EC2. Skipping compliance checks.", level="ERROR")
-        return
+        return None
+
+    rules = select_rules(EC2_RULES, enabled_rules)
+    if not rules:
+        log_message("No EC2 rules enabled. Skipping compliance checks.", level="WARNING")
+        return []
+    match_kb_rules(rules, compliance_rules)
+    needs_security_groups = "security_groups" in required_data(rules)
+
+    log_message(f"Starting EC2 compliance check in {region or 'the default region'}...")
+    if ec2 is None:
+        ec2 = create_client("ec2", region_name=region, rate_limit=rate_limit)
+
+    security_groups = SecurityGroupIndex(ec2)
+    state = None
+    if incremental:
+        # Each region and instance selection keeps its own state, otherwise
+        # instances outside the selection would show up as removed
+        state_name = f"ec2_{region}" if region else "ec2"
+        if filters != build_instance_filters():
+            state_name += "_" + fingerprint(filters)[:12]
+        state = IncrementalState(state_name, [rule.rule_id for rule in rules])
+
+    non_compliant_instances = report_writer if report_writer is not None else []
+    instance_count = 0
 
-    log_message("Starting EC2 compliance check...")
-    ec2 = boto3.client("ec2")
     try:
-        response = ec2.describe_instances()
+        for instances in iter_instance_pages(ec2, filters=filters):
+            # Resolve every group referenced on this page in bulk before checking
+            if needs_security_groups:
+                security_groups.prefetch_instances(instances)
+
+            instance_count += len(instances)
+            page_issues = evaluate_incrementally(
+                state, instances,
+                lambda instance: instance["InstanceId"],
+                lambda instance: instance_fingerprint_data(instance, security_groups),
+                lambda changed: check_instances(changed, rules, security_groups)
+            )
+            for instance, instance_issues in zip(instances, page_issues):
+                # Add issues to the list if any
+                if instance_issues:
+                    non_compliant_instances.append({
+                        "InstanceId": instance["InstanceId"],
+                        "Issues": instance_issues
+                    })
     except Exception as e:
-        log_message(f"Failed to describe EC2 instances: {e}", level="ERROR")
-        return
-
-    instances = response.get("Reservations", [])
-    log_message(f"Found {len(instances)} EC2 instances.")
-
-    non_compliant_instances = []
-
-    for reservation in instances:
-        for instance in reservation.get("Instances", []):
-            instance_id = instance["InstanceId"]
-            log_message(f"Checking compliance for EC2 instance: {instance_id}")
-
-            instance_issues = []
-
-            # 1. Check for the use of recommended AMIs
-            ami_id = instance.get("ImageId", "")
-            if ami_id != "ami-xxxxxxxxxxxxxxxxx":  # Replace with actual recommended AMI ID
-                instance_issues.append(f"Instance {instance_id} is not using the recommended AMI.")
-
-            # 2. Check Security Groups (Ensure no unrestricted access)
-            for security_group in instance.get("SecurityGroups", []):
-                sg_id = security_group["GroupId"]
-                try:
-                    sg_response = ec2.describe_security_groups(GroupIds=[sg_id])
-                    for sg in sg_response.get("SecurityGroups", []):
-                        for ip_permission in sg.get("IpPermissions", []):
-                            if "0.0.0.0/0" in [ip_range.get("CidrIp") for ip_range in ip_permission.get("IpRanges", [])]:
-                                instance_issues.append(f"Instance {instance_id} has unrestricted access in security group {sg_id}.")
-                except Exception as e:
-                    log_message(f"Failed to check security group {sg_id} for instance {instance_id}: {e}", level="ERROR")
-
-            # 3. Verify EC2 Key Pair
-            key_name = instance.get("KeyName", "")
-            if not key_name:
-                instance_issues.append(f"Instance {instance_id} does not have an associated key pair.")
-
-            # 4. Ensure Instances Are Properly Tagged
-            tags = {tag["Key"]: tag["Value"] for tag in instance.get("Tags", [])}
-            if "Name" not in tags:
-                instance_issues.append(f"Instance {instance_id} is not properly tagged with 'Name'.")
-
-            # Add issues to the list if any
-            if instance_issues:
-                non_compliant_instances.append({
-                    "InstanceId": instance_id,
-                    "Issues": instance_issues
-                })
+        log_message(f"Failed to describe EC2 instances or their security groups: {e}", level="ERROR")
+        return None
+
+    log_message(f"Found {instance_count} EC2 instances using {len(security_groups.groups)} security groups.")
+    if state:
+        state.save()
 
     # Save the compliance report
-    if non_compliant_instances:
-        save_report(non_compliant_instances, "reports/ec2_compliance_report.json")
-    else:
+    if not non_compliant_instances:
         log_message("All EC2 instances are compliant!")
+    elif report_path and report_writer is None:
+        save_report(non_compliant_instances, report_path)
+
+    return non_compliant_instances
 
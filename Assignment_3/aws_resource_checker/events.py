@@ -0,0 +1,254 @@
+import gzip
+import json
+import os
+import time
+
+from utils import log_message, save_report
+from aws_clients import create_client
+from security_groups import SecurityGroupIndex
+from ec2_checker import EC2_RULES, MAX_FILTER_VALUES, build_instance_filters, iter_ec2_instances, check_instances
+from s3_checker import S3_RULES, fetch_snapshot, evaluate_bucket
+from rule_engine import select_rules, required_data
+
+REPORT_PATH = "reports/event_compliance_report.json"
+
+# Seconds between checks for new events when following a file
+POLL_INTERVAL = 5
+
+# CloudTrail events that change what the S3 rules read
+S3_EVENTS = {
+    "CreateBucket",
+    "PutBucketPolicy",
+    "DeleteBucketPolicy",
+    "PutBucketEncryption",
+    "DeleteBucketEncryption",
+    "PutBucketVersioning",
+    "PutBucketLogging",
+    "PutBucketPublicAccessBlock",
+    "DeleteBucketPublicAccessBlock",
+}
+
+# CloudTrail security group events; every instance using the group is re-checked
+SECURITY_GROUP_EVENTS = {
+    "AuthorizeSecurityGroupIngress",
+    "RevokeSecurityGroupIngress",
+    "ModifySecurityGroupRules",
+}
+
+def security_group_id(name, parameters):
+    """
+    Returns the group ID named by a security group event's request
+    parameters. ModifySecurityGroupRules nests it in its request object.
+    """
+    if name == "ModifySecurityGroupRules":
+        return (parameters.get("ModifySecurityGroupRulesRequest") or {}).get("GroupId")
+    return parameters.get("groupId")
+
+def affected_resources(event):
+    """
+    Returns the resources a CloudTrail event changed as a list of
+    (service, region, kind, id) tuples, where kind is "bucket", "instance"
+    or "security_group". Events the rules do not depend on return [].
+    """
+    name = event.get("eventName")
+    region = event.get("awsRegion")
+    parameters = event.get("requestParameters") or {}
+
+    if name in S3_EVENTS and parameters.get("bucketName"):
+        return [("s3", None, "bucket", parameters["bucketName"])]
+
+    if name in SECURITY_GROUP_EVENTS:
+        group_id = security_group_id(name, parameters)
+        return [("ec2", region, "security_group", group_id)] if group_id else []
+
+    if name == "RunInstances":
+        items = ((event.get("responseElements") or {}).get("instancesSet") or {}).get("items", [])
+        return [("ec2", region, "instance", item["instanceId"]) for item in items if "instanceId" in item]
+    if name == "ModifyInstanceAttribute" and parameters.get("instanceId"):
+        return [("ec2", region, "instance", parameters["instanceId"])]
+    if name in ("CreateTags", "DeleteTags"):
+        items = (parameters.get("resourcesSet") or {}).get("items", [])
+        return [("ec2", region, "instance", item["resourceId"])
+                for item in items if item.get("resourceId", "").startswith("i-")]
+    return []
+
+def iter_event_file(filepath):
+    """
+    Yields the events in a CloudTrail log file ({"Records": [...]}, optionally
+    gzipped) or in a JSON Lines file with one event per line.
+    """
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, "rt", encoding="utf-8") as file:
+        content = file.read()
+    try:
+        document = json.loads(content)
+    except json.JSONDecodeError:
+        document = None
+    if isinstance(document, dict):
+        yield from document.get("Records", [document])
+        return
+    yield from parse_event_lines(content, filepath)
+
+def parse_event_lines(content, source):
+    """
+    Parses JSON Lines events, skipping (and logging) malformed lines.
+    """
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                log_message(f"Skipping malformed event on line {line_number} of {source}: {e}", level="WARNING")
+
+class EventProcessor:
+    """
+    Re-evaluates only the resources named in change events, with the same
+    rules as the full audits. Events are handled in batches: each affected
+    bucket or instance is checked once per batch however many events name
+    it. Clients are created once per service and region and reused.
+    """
+
+    def __init__(self, services=("ec2", "s3"), enabled_rules=None, rate_limit=None, ec2_clients=None, s3=None):
+        self.ec2_rules = select_rules(EC2_RULES, enabled_rules) if "ec2" in services else []
+        self.s3_rules = select_rules(S3_RULES, enabled_rules) if "s3" in services else []
+        self.rate_limit = rate_limit
+        self.ec2_clients = ec2_clients or {}
+        self.s3 = s3
+
+    def ec2_client(self, region):
+        if region not in self.ec2_clients:
+            self.ec2_clients[region] = create_client("ec2", region_name=region, rate_limit=self.rate_limit)
+        return self.ec2_clients[region]
+
+    def s3_client(self):
+        if self.s3 is None:
+            self.s3 = create_client("s3", rate_limit=self.rate_limit)
+        return self.s3
+
+    def process(self, events, report_writer=None):
+        """
+        Checks every resource affected by a batch of events. Returns the
+        non-compliant resources (or report_writer, which receives them),
+        each with the names of the events that triggered its check.
+        """
+        buckets = {}
+        instances = {}
+        security_groups = {}
+        for event in events:
+            for service, region, kind, resource_id in affected_resources(event):
+                target = {"bucket": buckets, "instance": instances, "security_group": security_groups}[kind]
+                target.setdefault((region, resource_id), []).append(event.get("eventName"))
+
+        findings = report_writer if report_writer is not None else []
+        if self.s3_rules:
+            for (_, bucket_name), event_names in buckets.items():
+                self._check_bucket(bucket_name, event_names, findings)
+        if self.ec2_rules:
+            for region in {region for region, _ in instances} | {region for region, _ in security_groups}:
+                self._check_instances(
+                    region,
+                    {instance_id: names for (r, instance_id), names in instances.items() if r == region},
+                    {group_id: names for (r, group_id), names in security_groups.items() if r == region},
+                    findings
+                )
+
+        log_message(f"Processed {len(events)} events: checked {len(buckets)} buckets, "
+                    f"{len(instances)} instances and {len(security_groups)} security groups.")
+        return findings
+
+    def _check_bucket(self, bucket_name, event_names, findings):
+        snapshot = fetch_snapshot(self.s3_client(), bucket_name, required_data(self.s3_rules))
+        if snapshot is None:
+            return
+        if any(error["Code"] == "NoSuchBucket" for error in snapshot.errors.values()):
+            log_message(f"Bucket {bucket_name} no longer exists, skipping.", level="WARNING")
+            return
+        issues = evaluate_bucket(snapshot, self.s3_rules)
+        if issues:
+            findings.append({"BucketName": bucket_name, "Issues": issues, "Events": sorted(set(event_names))})
+
+    def _check_instances(self, region, instance_events, group_events, findings):
+        ec2 = self.ec2_client(region)
+        batches = []
+        instance_ids = sorted(instance_events)
+        for start in range(0, len(instance_ids), MAX_FILTER_VALUES):
+            batches.append(build_instance_filters(instance_ids=instance_ids[start:start + MAX_FILTER_VALUES]))
+        group_ids = sorted(group_events)
+        for start in range(0, len(group_ids), MAX_FILTER_VALUES):
+            batches.append(build_instance_filters() +
+                           [{"Name": "instance.group-id", "Values": group_ids[start:start + MAX_FILTER_VALUES]}])
+
+        instances = {}
+        try:
+            for filters in batches:
+                for instance in iter_ec2_instances(ec2, filters=filters):
+                    instances[instance["InstanceId"]] = instance
+        except Exception as e:
+            log_message(f"Failed to describe EC2 instances in {region or 'the default region'}: {e}", level="ERROR")
+            return
+
+        index = SecurityGroupIndex(ec2)
+        if "security_groups" in required_data(self.ec2_rules):
+            try:
+                index.prefetch_instances(instances.values())
+            except Exception as e:
+                log_message(f"Failed to describe security groups in {region or 'the default region'}: {e}",
+                            level="ERROR")
+                return
+        checked = list(instances.values())
+        for instance, issues in zip(checked, check_instances(checked, self.ec2_rules, index)):
+            if not issues:
+                continue
+            event_names = list(instance_events.get(instance["InstanceId"], []))
+            for security_group in instance.get("SecurityGroups", []):
+                event_names.extend(group_events.get(security_group["GroupId"], []))
+            findings.append({"InstanceId": instance["InstanceId"], "Issues": issues,
+                             "Events": sorted(set(event_names))})
+
+def process_event_file(filepath, services=("ec2", "s3"), enabled_rules=None, rate_limit=None,
+                       report_path=REPORT_PATH, report_writer=None, follow=False,
+                       poll_interval=POLL_INTERVAL, processor=None):
+    """
+    Checks the resources changed by the events in a file. With follow=True
+    the file is treated as a queue: events appended to it (one JSON object
+    per line) are processed as they arrive, until interrupted. Returns the
+    non-compliant resources, or None if the file could not be read.
+    """
+    processor = processor or EventProcessor(services, enabled_rules, rate_limit)
+    findings = report_writer if report_writer is not None else []
+    try:
+        processor.process(list(iter_event_file(filepath)), findings)
+    except (OSError, json.JSONDecodeError) as e:
+        log_message(f"Failed to read events from {filepath}: {e}", level="ERROR")
+        return None
+
+    if follow:
+        follow_event_file(filepath, processor, findings, poll_interval)
+
+    if not findings:
+        log_message("All resources named in the events are compliant!")
+    elif report_path and report_writer is None:
+        save_report(findings, report_path)
+    return findings
+
+def follow_event_file(filepath, processor, findings, poll_interval=POLL_INTERVAL):
+    """
+    Processes the JSON Lines events appended to filepath after the current
+    end of the file, one batch per poll, until interrupted.
+    """
+    log_message(f"Waiting for new events in {filepath}...")
+    position = os.path.getsize(filepath)
+    try:
+        while True:
+            time.sleep(poll_interval)
+            with open(filepath, "rb") as file:
+                file.seek(position)
+                data = file.read()
+            # Leave a partly written last line for the next poll
+            complete = data[:data.rfind(b"\n") + 1]
+            position += len(complete)
+            events = list(parse_event_lines(complete.decode("utf-8"), filepath))
+            if events:
+                processor.process(events, findings)
+    except KeyboardInterrupt:
+        log_message("Stopped following events.")
@@ -0,0 +1,238 @@
+"""
+A local stand-in for the EC2 and S3 APIs used by the checkers, for
+measuring and regression-testing audits without an AWS account.
+
+A fleet is plain JSON data: EC2 instances and security groups in their
+describe_* shapes, and S3 buckets as BucketSnapshot dicts. Fleets can be
+synthesized at any size, or recorded from a real account once with
+record_fleet() and replayed offline from then on.
+"""
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+from metrics import METRICS
+from s3_snapshot import BucketSnapshot, ENDPOINTS
+from ec2_checker import iter_ec2_instances, MAX_FILTER_VALUES
+
+def client_error(code, operation_name):
+    return ClientError({"Error": {"Code": code, "Message": ""}}, operation_name)
+
+class FakeClient:
+    """
+    Shared plumbing: per-operation call counting and optional latency.
+    Calls are also recorded in METRICS like those of a real client.
+    """
+
+    service_id = ""
+
+    # Lets checkers catch s3.exceptions.ClientError as with a boto3 client
+    class exceptions:
+        ClientError = ClientError
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def _call(self, operation_name):
+        with self.lock:
+            self.calls[operation_name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        METRICS.record_call(f"{self.service_id}.{operation_name}", self.latency, 0)
+
+def matches_filters(instance, filters):
+    """
+    Applies the describe_instances filters the checkers use.
+    """
+    tags = {tag["Key"]: tag["Value"] for tag in instance.get("Tags", [])}
+    for instance_filter in filters:
+        name, values = instance_filter["Name"], instance_filter["Values"]
+        if len(values) > MAX_FILTER_VALUES:
+            raise client_error("FilterLimitExceeded", "DescribeInstances")
+        if name == "instance-state-name":
+            value = instance.get("State", {}).get("Name")
+        elif name == "vpc-id":
+            value = instance.get("VpcId")
+        elif name == "instance-id":
+            value = instance["InstanceId"]
+        elif name == "instance.group-id":
+            if not any(group["GroupId"] in values for group in instance.get("SecurityGroups", [])):
+                return False
+            continue
+        elif name.startswith("tag:"):
+            value = tags.get(name[len("tag:"):])
+        else:
+            raise client_error("InvalidParameterValue", "DescribeInstances")
+        if value not in values:
+            return False
+    return True
+
+class FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, **kwargs):
+        return self.pages(**kwargs)
+
+class FakeEC2Client(FakeClient):
+    service_id = "EC2"
+
+    def __init__(self, fleet, latency=0.0):
+        super().__init__(latency)
+        self.instances = fleet["Instances"]
+        self.security_groups = {sg["GroupId"]: sg for sg in fleet["SecurityGroups"]}
+
+    def get_paginator(self, operation_name):
+        pages = {
+            "describe_instances": self._describe_instances_pages,
+            "describe_security_groups": self._describe_security_groups_pages,
+        }[operation_name]
+        return FakePaginator(pages)
+
+    def _describe_instances_pages(self, Filters=None, PaginationConfig=None, **kwargs):
+        page_size = (PaginationConfig or {}).get("PageSize") or 1000
+        instances = [instance for instance in self.instances if matches_filters(instance, Filters or [])]
+        for start in range(0, max(len(instances), 1), page_size):
+            self._call("DescribeInstances")
+            # One instance per reservation, as with instances launched one at a time
+            yield {"Reservations": [{"Instances": [instance]} for instance in instances[start:start + page_size]]}
+
+    def _describe_security_groups_pages(self, GroupIds=None, **kwargs):
+        self._call("DescribeSecurityGroups")
+        if GroupIds is None:
+            yield {"SecurityGroups": list(self.security_groups.values())}
+            return
+        missing = [group_id for group_id in GroupIds if group_id not in self.security_groups]
+        if missing:
+            raise client_error("InvalidGroup.NotFound", "DescribeSecurityGroups")
+        yield {"SecurityGroups": [self.security_groups[group_id] for group_id in GroupIds]}
+
+    def describe_security_groups(self, GroupIds=None, **kwargs):
+        return next(iter(self._describe_security_groups_pages(GroupIds)))
+
+class FakeS3Client(FakeClient):
+    service_id = "S3"
+
+    def __init__(self, fleet, latency=0.0):
+        super().__init__(latency)
+        self.buckets = {bucket["BucketName"]: bucket for bucket in fleet["Buckets"]}
+        for key, method_name in ENDPOINTS.items():
+            setattr(self, method_name, self._endpoint(key, method_name))
+
+    def list_buckets(self):
+        self._call("ListBuckets")
+        return {"Buckets": [{"Name": name} for name in self.buckets]}
+
+    def _endpoint(self, key, method_name):
+        operation_name = "".join(part.title() for part in method_name.split("_"))
+
+        def method(Bucket):
+            self._call(operation_name)
+            bucket = self.buckets.get(Bucket)
+            if bucket is None:
+                raise client_error("NoSuchBucket", operation_name)
+            if key in bucket.get("Errors", {}):
+                raise client_error(bucket["Errors"][key]["Code"], operation_name)
+            return json.loads(json.dumps(bucket["Responses"][key]))
+
+        return method
+
+def synthesize_fleet(instance_count=10000, bucket_count=5000, security_group_count=500, seed=0):
+    """
+    Generates a fleet with a realistic mix of compliant and non-compliant
+    resources. The same seed always produces the same fleet.
+    """
+    rng = random.Random(seed)
+
+    security_groups = []
+    for n in range(security_group_count):
+        open_to_world = rng.random() < 0.1
+        security_groups.append({
+            "GroupId": f"sg-{n:017x}",
+            "GroupName": f"group-{n}",
+            "IpPermissions": [{
+                "IpProtocol": "tcp",
+                "FromPort": 22,
+                "ToPort": 22,
+                "IpRanges": [{"CidrIp": "0.0.0.0/0" if open_to_world else "10.0.0.0/8"}],
+                "Ipv6Ranges": [{"CidrIpv6": "::/0"}] if open_to_world and rng.random() < 0.5 else [],
+            }],
+        })
+
+    instances = []
+    for n in range(instance_count):
+        instance = {
+            "InstanceId": f"i-{n:017x}",
+            "ImageId": rng.choice(["ami-xxxxxxxxxxxxxxxxx", "ami-0abcdef1234567890", "ami-0fedcba9876543210"]),
+            "InstanceType": rng.choice(["t3.micro", "m5.large", "c5.xlarge"]),
+            "State": rng.choice([{"Code": 16, "Name": "running"}] * 8 + [{"Code": 80, "Name": "stopped"},
+                                                                        {"Code": 48, "Name": "terminated"}]),
+            "VpcId": f"vpc-{rng.randrange(10):017x}",
+            "LaunchTime": "2024-11-01T00:00:00+00:00",
+            "NetworkInterfaces": [{"NetworkInterfaceId": f"eni-{n:017x}", "PrivateIpAddress": f"10.0.{n // 250 % 256}.{n % 250}"}],
+            "SecurityGroups": [
+                {"GroupId": sg["GroupId"], "GroupName": sg["GroupName"]}
+                for sg in rng.sample(security_groups, rng.randint(1, 3))
+            ],
+            "Tags": [{"Key": "Team", "Value": rng.choice(["web", "data", "ops"])}],
+        }
+        if rng.random() < 0.8:
+            instance["KeyName"] = "default-key"
+        if rng.random() < 0.9:
+            instance["Tags"].append({"Key": "Name", "Value": f"server-{n}"})
+        instances.append(instance)
+
+    buckets = []
+    for n in range(bucket_count):
+        responses = {
+            "versioning": rng.choice([{}, {"Status": "Enabled"}, {"Status": "Enabled", "MFADelete": "Enabled"}]),
+            "logging": {"LoggingEnabled": {"TargetBucket": "logs"}} if rng.random() < 0.5 else {},
+            "location": {"LocationConstraint": rng.choice([None, "eu-west-1", "ap-southeast-2"])},
+        }
+        errors = {}
+        if rng.random() < 0.8:
+            responses["public_access_block"] = {"PublicAccessBlockConfiguration": {"BlockPublicAcls": rng.random() < 0.9}}
+        else:
+            errors["public_access_block"] = {"Code": "NoSuchPublicAccessBlockConfiguration", "Message": ""}
+        if rng.random() < 0.9:
+            responses["encryption"] = {"ServerSideEncryptionConfiguration": {"Rules": []}}
+        else:
+            errors["encryption"] = {"Code": "ServerSideEncryptionConfigurationNotFoundError", "Message": ""}
+        if rng.random() < 0.3:
+            principal = "*" if rng.random() < 0.2 else {"AWS": "arn:aws:iam::123456789012:root"}
+            responses["policy"] = {"Policy": json.dumps({"Statement": [{"Effect": "Allow", "Principal": principal}]})}
+        else:
+            errors["policy"] = {"Code": "NoSuchBucketPolicy", "Message": ""}
+        buckets.append(BucketSnapshot(f"bucket-{n:05d}", responses, errors).to_dict())
+
+    return {"Instances": instances, "SecurityGroups": security_groups, "Buckets": buckets}
+
+def record_fleet(ec2=None, s3=None):
+    """
+    Captures a real account's EC2 and S3 configuration as a fleet, using
+    the same calls as the checkers, so it can be replayed offline.
+    """
+    fleet = {"Instances": [], "SecurityGroups": [], "Buckets": []}
+    if ec2 is not None:
+        fleet["Instances"] = list(iter_ec2_instances(ec2))
+        for page in ec2.get_paginator("describe_security_groups").paginate():
+            fleet["SecurityGroups"].extend(page.get("SecurityGroups", []))
+    if s3 is not None:
+        for bucket in s3.list_buckets().get("Buckets", []):
+            fleet["Buckets"].append(BucketSnapshot.fetch(s3, bucket["Name"]).to_dict())
+    return fleet
+
+def save_fleet(fleet, filepath):
+    with open(filepath, "w") as file:
+        json.dump(fleet, file, default=str)
+
+def load_fleet(filepath):
+    with open(filepath, "r") as file:
+        return json.load(file)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+from utils import log_message, save_report
+
+STATE_DIR = "reports/state"
+REPORT_DIR = "reports"
+
+def fingerprint(data):
+    """
+    Returns a stable hash of a resource's relevant configuration.
+    """
+    encoded = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def evaluate_incrementally(state, resources, get_id, get_fingerprint_data, evaluate_batch):
+    """
+    Evaluates a batch of resources, re-running evaluate_batch only on those
+    whose fingerprint changed since the previous run. With no state every
+    resource is evaluated. Returns one list of issues per resource.
+    """
+    if state is None:
+        return evaluate_batch(resources)
+
+    results = {}
+    changed = []
+    for resource in resources:
+        resource_id = get_id(resource)
+        resource_fingerprint = fingerprint(get_fingerprint_data(resource))
+        previous_issues = state.lookup(resource_id, resource_fingerprint)
+        if previous_issues is None:
+            changed.append((resource, resource_fingerprint))
+        else:
+            results[resource_id] = previous_issues
+
+    evaluated = evaluate_batch([resource for resource, _ in changed])
+    for (resource, resource_fingerprint), issues in zip(changed, evaluated):
+        state.record(get_id(resource), resource_fingerprint, issues)
+        results[get_id(resource)] = issues
+
+    return [results[get_id(resource)] for resource in resources]
+
+class IncrementalState:
+    """
+    Remembers the configuration fingerprint and issues of every resource
+    from the previous run, so resources whose fingerprint is unchanged can
+    reuse their previous result instead of being re-evaluated.
+
+    The state is discarded when the enabled rule set changes, since the
+    previous results would no longer be comparable.
+    """
+
+    def __init__(self, name, rule_ids, state_dir=STATE_DIR):
+        self.name = name
+        self.rule_ids = sorted(rule_ids)
+        self.state_path = os.path.join(state_dir, f"{name}_fingerprints.json")
+        self.previous = self._load()
+        self.current = {}
+        self.reevaluated = 0
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r") as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            log_message(f"Ignoring unreadable incremental state {self.state_path}: {e}", level="WARNING")
+            return {}
+
+        if state.get("Rules") != self.rule_ids:
+            log_message(f"Enabled rules changed since the last {self.name} run; re-evaluating everything.")
+            return {}
+        return state.get("Resources", {})
+
+    def lookup(self, resource_id, resource_fingerprint):
+        """
+        Returns the previous issues if the resource is unchanged, otherwise None.
+        An unchanged resource is carried over into the current state.
+        """
+        previous = self.previous.get(resource_id)
+        if previous is None or previous["Fingerprint"] != resource_fingerprint:
+            return None
+        self.current[resource_id] = previous
+        return previous["Issues"]
+
+    def record(self, resource_id, resource_fingerprint, issues):
+        """
+        Stores the result of re-evaluating a new or changed resource.
+        """
+        self.reevaluated += 1
+        self.current[resource_id] = {"Fingerprint": resource_fingerprint, "Issues": issues}
+
+    def diff(self):
+        """
+        Compares this run's findings with the previous run's.
+        """
+        new, resolved, changed = [], [], []
+        for resource_id, entry in self.current.items():
+            issues = entry["Issues"]
+            previous_issues = self.previous.get(resource_id, {}).get("Issues", [])
+            if issues and not previous_issues:
+                new.append({"ResourceId": resource_id, "Issues": issues})
+            elif previous_issues and not issues:
+                resolved.append({"ResourceId": resource_id, "Issues": previous_issues})
+            elif issues != previous_issues:
+                changed.append({"ResourceId": resource_id, "Issues": issues, "PreviousIssues": previous_issues})
+
+        removed = sorted(self.previous.keys() - self.current.keys())
+        return {
+            "Reevaluated": self.reevaluated,
+            "Unchanged": len(self.current) - self.reevaluated,
+            "NewFindings": new,
+            "ResolvedFindings": resolved,
+            "ChangedFindings": changed,
+            "RemovedResources": removed,
+        }
+
+    def save(self):
+        """
+        Persists the current state and writes the diff report next to the
+        full report as reports/<name>_compliance_diff.json.
+        """
+        diff = self.diff()
+        log_message(
+            f"Incremental {self.name} audit: {diff['Reevaluated']} re-evaluated, {diff['Unchanged']} unchanged, "
+            f"{len(diff['NewFindings'])} new, {len(diff['ResolvedFindings'])} resolved, "
+            f"{len(diff['ChangedFindings'])} changed, {len(diff['RemovedResources'])} removed."
+        )
+        save_report({"Rules": self.rule_ids, "Resources": self.current}, self.state_path)
+        save_report(diff, os.path.join(REPORT_DIR, f"{self.name}_compliance_diff.json"))
+        return diff
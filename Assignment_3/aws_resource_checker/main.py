@@ -1,26 +1,277 @@
 import argparse
-from ec2_checker import check_ec2_compliance
-from s3_checker import check_s3_compliance
-from utils import log_message
+from compliance_rules import DEFAULT_TTL
+from utils import log_message, setup_logging, ReportWriter
+from metrics import METRICS, METRICS_PATH
+from defaults import (DEFAULT_WORKERS, INSTANCE_STATES, DEFAULT_INSTANCE_STATES, EC2_RULE_IDS, S3_RULE_IDS,
+                      DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_AGE)
+
+# The checkers, the daemon and the event mode are imported only when
+# selected, and boto3, requests and BeautifulSoup only when a client or a
+# rules fetch needs them, so --help and cached single-service runs start
+# quickly (see benchmarks/bench_startup.py). The option defaults come from
+# defaults.py, which imports nothing.
+
+def positive_float(value):
+    # argparse type for options that must be greater than zero
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
 
 def main():
     parser = argparse.ArgumentParser(description="AWS Resource Compliance Checker")
     parser.add_argument(
         "--service",
-        choices=["ec2", "s3"],
+        choices=["ec2", "s3", "all"],
         required=True,
-        help="Select the AWS service to check compliance for (ec2 or s3)"
+        help="Select the AWS service to check compliance for (ec2, s3 or all)"
+    )
+    parser.add_argument(
+        "--regions",
+        nargs="+",
+        metavar="REGION",
+        help="Regions to audit EC2 in, concurrently (default: the configured region)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of S3 buckets to check concurrently (default {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--rules-ttl",
+        type=int,
+        default=DEFAULT_TTL,
+        help=f"Seconds before cached compliance rules are revalidated (default {DEFAULT_TTL})"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use the last cached compliance rules without contacting the knowledge base"
+    )
+    parser.add_argument(
+        "--rules",
+        nargs="+",
+        metavar="RULE_ID",
+        choices=EC2_RULE_IDS + S3_RULE_IDS,
+        help="Only evaluate these rules (default: all). Choices: %(choices)s"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-evaluate resources whose configuration changed since the last run, and write a diff report"
+    )
+    parser.add_argument(
+        "--instance-states",
+        nargs="+",
+        metavar="STATE",
+        choices=INSTANCE_STATES,
+        default=DEFAULT_INSTANCE_STATES,
+        help="Only audit EC2 instances in these states (default: %(default)s). Choices: %(choices)s"
+    )
+    parser.add_argument(
+        "--tag",
+        action="append",
+        metavar="KEY=VALUE",
+        help="Only audit EC2 instances with this tag; may be repeated"
+    )
+    parser.add_argument(
+        "--vpc-ids",
+        nargs="+",
+        metavar="VPC_ID",
+        help="Only audit EC2 instances in these VPCs"
+    )
+    parser.add_argument(
+        "--instance-ids",
+        nargs="+",
+        metavar="INSTANCE_ID",
+        help="Only audit these EC2 instances"
+    )
+    parser.add_argument(
+        "--report-format",
+        choices=["json", "jsonl", "jsonl.gz"],
+        default="json",
+        help="json writes the report at the end; jsonl and jsonl.gz stream findings as they are found"
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON Lines reports without spaces after separators"
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default="text",
+        help="Write log lines as text or as one JSON object per line"
+    )
+    parser.add_argument(
+        "--log-sample",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Log only one in N per-resource progress messages (default 1: log all)"
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=positive_float,
+        metavar="CALLS_PER_SECOND",
+        help="Limit each AWS API operation to this many calls per second (default: per-service limits)"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=METRICS_PATH,
+        help=f"Where to write per-operation and per-rule timings (default {METRICS_PATH})"
+    )
+    parser.add_argument(
+        "--events",
+        metavar="PATH",
+        help="Only check the resources changed by the CloudTrail events in this file instead of every resource"
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="With --events, keep checking events appended to the file (one JSON object per line)"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep running and serve audits over HTTP (or --socket) instead of auditing once"
+    )
+    parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help="Address to serve on with --serve (default %(default)s)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="Port to serve on with --serve (default %(default)s, 0: any free port)"
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Serve on this Unix socket instead of a TCP port"
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        metavar="SECONDS",
+        help="With --serve, also run every audit on this schedule"
+    )
+    parser.add_argument(
+        "--max-age",
+        type=int,
+        metavar="SECONDS",
+        default=DEFAULT_MAX_AGE,
+        help="With --serve, return results younger than this without auditing again (default %(default)s)"
     )
     args = parser.parse_args()
 
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.log_sample < 1:
+        parser.error("--log-sample must be at least 1")
+    if args.follow and not args.events:
+        parser.error("--follow requires --events")
+    if args.interval is not None and args.interval <= 0:
+        parser.error("--interval must be greater than 0")
+    if args.max_age <= 0:
+        parser.error("--max-age must be greater than 0")
+
+    tags = {}
+    for tag in args.tag or []:
+        key, separator, value = tag.partition("=")
+        if not separator or not key:
+            parser.error(f"--tag must be KEY=VALUE, got {tag!r}")
+        tags[key] = value
+
+    setup_logging(json_format=args.log_format == "json", sample_every=args.log_sample)
+    regions = args.regions or []
+    services = ["ec2", "s3"] if args.service == "all" else [args.service]
+
+    instance_filters = None
+    if "ec2" in services and not args.events:
+        from ec2_checker import build_instance_filters
+        instance_filters = build_instance_filters(args.instance_states, tags, args.vpc_ids, args.instance_ids)
+
+    if args.serve:
+        from daemon import AuditService, serve
+
+        audit_service = AuditService(
+            services, regions,
+            workers=args.workers, rules_ttl=args.rules_ttl, offline=args.offline,
+            max_age=args.max_age,
+            audit_options={"enabled_rules": args.rules, "incremental": args.incremental,
+                           "rate_limit": args.max_rate, "instance_filters": instance_filters})
+        serve(audit_service, host=args.host, port=args.port,
+              unix_socket=args.socket, interval=args.interval)
+        return
+
     log_message("Starting compliance checks...")
-    
-    if args.service == "ec2":
-        check_ec2_compliance()
+    if args.events:
+        from events import process_event_file, REPORT_PATH as EVENTS_REPORT_PATH
+
+        report_path = EVENTS_REPORT_PATH
+        audit = lambda **report_options: process_event_file(
+            args.events, services,
+            enabled_rules=args.rules, rate_limit=args.max_rate, follow=args.follow, **report_options)
+    elif args.service == "all" or len(regions) > 1:
+        from orchestrator import run_audit, REPORT_PATH as MERGED_REPORT_PATH
+
+        report_path = MERGED_REPORT_PATH
+        audit = lambda **report_options: run_audit(
+            services, regions, workers=args.workers, rules_ttl=args.rules_ttl, offline=args.offline,
+            enabled_rules=args.rules, incremental=args.incremental, rate_limit=args.max_rate,
+            instance_filters=instance_filters, **report_options)
+    elif args.service == "ec2":
+        from ec2_checker import check_ec2_compliance, REPORT_PATH as EC2_REPORT_PATH
+
+        region = regions[0] if regions else None
+        report_path = EC2_REPORT_PATH
+        audit = lambda **report_options: check_ec2_compliance(
+            rules_ttl=args.rules_ttl, offline=args.offline, region=region,
+            enabled_rules=args.rules, incremental=args.incremental, rate_limit=args.max_rate,
+            filters=instance_filters, **report_options)
     elif args.service == "s3":
-        check_s3_compliance()
+        from s3_checker import check_s3_compliance, REPORT_PATH as S3_REPORT_PATH
+
+        report_path = S3_REPORT_PATH
+        audit = lambda **report_options: check_s3_compliance(
+            workers=args.workers, rules_ttl=args.rules_ttl, offline=args.offline,
+            enabled_rules=args.rules, incremental=args.incremental, rate_limit=args.max_rate,
+            **report_options)
     else:
         log_message("Invalid service selected.", level="ERROR")
+        return
+
+    try:
+        run_audit_with_report(audit, report_path, args)
+    finally:
+        log_message("Audit timing summary:\n" + METRICS.summary_table())
+        METRICS.save(args.metrics_file)
+        log_message(f"Metrics saved to {args.metrics_file}")
+
+def run_audit_with_report(audit, report_path, args):
+    """
+    Runs the audit, streaming findings through a ReportWriter for the
+    JSON Lines report formats.
+    """
+    if args.report_format == "json":
+        audit()
+        return
+
+    # Stream findings to <report>.jsonl[.gz]; the previous report is only
+    # replaced if the audit completes
+    writer = ReportWriter(report_path[:-len(".json")] + "." + args.report_format, compact=args.compact)
+    result = None
+    try:
+        result = audit(report_path=None, report_writer=writer)
+    finally:
+        if result is None:
+            writer.abort()
+        else:
+            writer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (in milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf")]
+
+METRICS_PATH = "reports/audit_metrics.json"
+
+def new_histogram():
+    return [0] * len(LATENCY_BUCKETS_MS)
+
+def observe(histogram, milliseconds):
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if milliseconds <= bound:
+            histogram[index] += 1
+            return
+
+class Metrics:
+    """
+    Collects where an audit spends its time: every AWS API call (count,
+    errors, latency histogram and response bytes per operation), every
+    rule (time and resources evaluated) and named phases such as rule
+    fetching. Safe to update from any thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations = {}
+        self.rules = {}
+        self.phases = {}
+
+    def attach(self, client):
+        """
+        Records every call made through a boto3 client, using botocore's
+        before-send, after-call and after-call-error events. The timer is
+        restarted by before-send on every HTTP attempt, so the latency is
+        that of the final request to AWS, without rate limiter waits or
+        earlier retries.
+        """
+        service_id = client.meta.service_model.service_id.hyphenize()
+        # Registered last on the unqualified event so that it runs after
+        # every other before-send handler, including the wait of
+        # botocore's adaptive retry mode
+        client.meta.events.register_last("before-send", self._before_send)
+        client.meta.events.register(f"after-call.{service_id}.*", self._after_call)
+        client.meta.events.register(f"after-call-error.{service_id}.*", self._after_call_error)
+
+    def _before_send(self, request, **kwargs):
+        # The prepared request shares the call's context dict
+        request.context["metrics_start"] = time.perf_counter()
+
+    def _after_call(self, model, context, http_response=None, **kwargs):
+        content = getattr(http_response, "content", None) or b""
+        self.record_call(f"{model.service_model.service_id}.{model.name}",
+                         time.perf_counter() - context.get("metrics_start", time.perf_counter()),
+                         len(content), error=False)
+
+    def _after_call_error(self, model, context, **kwargs):
+        self.record_call(f"{model.service_model.service_id}.{model.name}",
+                         time.perf_counter() - context.get("metrics_start", time.perf_counter()),
+                         0, error=True)
+
+    def record_call(self, operation, seconds, response_bytes, error=False):
+        with self.lock:
+            entry = self.operations.setdefault(operation, {
+                "Calls": 0, "Errors": 0, "Bytes": 0, "Seconds": 0.0, "LatencyHistogram": new_histogram()
+            })
+            entry["Calls"] += 1
+            entry["Errors"] += int(error)
+            entry["Bytes"] += response_bytes
+            entry["Seconds"] += seconds
+            observe(entry["LatencyHistogram"], seconds * 1000)
+
+    def record_rule(self, rule_id, seconds, resources):
+        with self.lock:
+            entry = self.rules.setdefault(rule_id, {"Resources": 0, "Seconds": 0.0})
+            entry["Resources"] += resources
+            entry["Seconds"] += seconds
+
+    def record_phase(self, phase, seconds):
+        with self.lock:
+            entry = self.phases.setdefault(phase, {"Runs": 0, "Seconds": 0.0})
+            entry["Runs"] += 1
+            entry["Seconds"] += seconds
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(phase, time.perf_counter() - start)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "LatencyBucketsMs": [str(bound) for bound in LATENCY_BUCKETS_MS],
+                "Phases": json.loads(json.dumps(self.phases)),
+                "Operations": json.loads(json.dumps(self.operations)),
+                "Rules": json.loads(json.dumps(self.rules)),
+            }
+
+    def summary_table(self):
+        """
+        Returns a plain-text table of phases, API operations and rules,
+        slowest first.
+        """
+        data = self.to_dict()
+        lines = [f"{'Phase':<40}{'Runs':>8}{'Total s':>10}"]
+        for phase, entry in sorted(data["Phases"].items(), key=lambda item: -item[1]["Seconds"]):
+            lines.append(f"{phase:<40}{entry['Runs']:>8}{entry['Seconds']:>10.2f}")
+
+        lines.append("")
+        lines.append(f"{'API operation':<40}{'Calls':>8}{'Errors':>8}{'Total s':>10}{'Avg ms':>9}{'KiB':>10}")
+        for operation, entry in sorted(data["Operations"].items(), key=lambda item: -item[1]["Seconds"]):
+            average_ms = entry["Seconds"] * 1000 / entry["Calls"]
+            lines.append(f"{operation:<40}{entry['Calls']:>8}{entry['Errors']:>8}{entry['Seconds']:>10.2f}"
+                         f"{average_ms:>9.1f}{entry['Bytes'] / 1024:>10.1f}")
+
+        lines.append("")
+        lines.append(f"{'Rule':<40}{'Resources':>10}{'Total ms':>10}")
+        for rule_id, entry in sorted(data["Rules"].items(), key=lambda item: -item[1]["Seconds"]):
+            lines.append(f"{rule_id:<40}{entry['Resources']:>10}{entry['Seconds'] * 1000:>10.1f}")
+        return "\n".join(lines)
+
+    def save(self, filepath=METRICS_PATH):
+        directory = os.path.dirname(filepath)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(filepath, "w") as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+# Process-wide metrics shared by every client, checker and rule
+METRICS = Metrics()
+
+def timed(phase):
+    """
+    Decorator recording each call of the function as a run of `phase`.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with METRICS.timer(phase):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
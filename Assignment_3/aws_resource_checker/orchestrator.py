@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import log_message, save_report
+from aws_clients import create_client
+from compliance_rules import fetch_compliance_rules, DEFAULT_TTL
+from ec2_checker import check_ec2_compliance
+from s3_checker import check_s3_compliance, DEFAULT_WORKERS
+
+REPORT_PATH = "reports/compliance_report.json"
+
+# S3 buckets are listed account-wide, so the S3 audit runs once, not per region
+GLOBAL_REGION = "global"
+
+def tag_findings(report_writer, service, region):
+    """
+    Returns a view of report_writer that tags findings with their Service
+    and Region, or None when findings are collected in memory.
+    """
+    if report_writer is None:
+        return None
+    return report_writer.tagged(Service=service, Region=region or "default")
+
+def run_audit(services, regions, workers=DEFAULT_WORKERS, rules_ttl=DEFAULT_TTL,
+              offline=False, report_path=REPORT_PATH, enabled_rules=None,
+              incremental=False, report_writer=None, rate_limit=None, instance_filters=None):
+    """
+    Runs the EC2 audit for every region and the S3 audit concurrently, then
+    merges the findings into one report tagged with Service and Region.
+    Rules are fetched once per service and shared by every audit, so the run
+    takes about as long as the slowest audit rather than the sum of them.
+    If report_writer is given, every audit streams its tagged findings into
+    it as they are found, and an audit that fails is followed by an
+    {"Incomplete": true} record for its Service and Region, since the
+    findings it streamed may be partial. Returns the merged findings (or
+    the writer).
+    """
+    compliance_rules = {}
+    for service in services:
+        log_message(f"Fetching {service.upper()} compliance rules...")
+        compliance_rules[service] = fetch_compliance_rules(service, ttl=rules_ttl, offline=offline)
+
+    # Clients are created here, before any audit thread starts: creating
+    # clients on boto3's shared default session is not thread-safe
+    clients = {}
+    failures = []
+    client_specs = [("ec2", region, {"region_name": region}) for region in (regions or [None])
+                    if "ec2" in services]
+    if "s3" in services:
+        client_specs.append(("s3", GLOBAL_REGION, {"max_pool_connections": workers}))
+    for service, region, options in client_specs:
+        try:
+            clients[(service, region)] = create_client(service, rate_limit=rate_limit, **options)
+        except Exception as e:
+            log_message(f"Failed to create the {service.upper()} client for {region or 'the default region'}: {e}",
+                        level="ERROR")
+            failures.append((service, region, str(e)))
+
+    # Each task is (service, region, callable returning findings or None)
+    tasks = []
+    for (service, region), client in clients.items():
+        if service == "ec2":
+            tasks.append(("ec2", region, lambda region=region, client=client: check_ec2_compliance(
+                region=region, compliance_rules=compliance_rules["ec2"], report_path=None,
+                enabled_rules=enabled_rules, incremental=incremental, ec2=client,
+                filters=instance_filters, report_writer=tag_findings(report_writer, "ec2", region))))
+        else:
+            tasks.append(("s3", GLOBAL_REGION, lambda client=client: check_s3_compliance(
+                workers=workers, compliance_rules=compliance_rules["s3"], report_path=None,
+                enabled_rules=enabled_rules, incremental=incremental, s3=client,
+                report_writer=tag_findings(report_writer, "s3", GLOBAL_REGION))))
+
+    log_message(f"Running {len(tasks)} audits concurrently...")
+    with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+        futures = [executor.submit(audit) for _, _, audit in tasks]
+
+        merged = report_writer if report_writer is not None else []
+        for (service, region, _), future in zip(tasks, futures):
+            try:
+                findings = future.result()
+            except Exception as e:
+                log_message(f"{service.upper()} audit in {region or 'the default region'} failed: {e}", level="ERROR")
+                failures.append((service, region, str(e)))
+                continue
+            if findings is None:
+                log_message(f"{service.upper()} audit in {region or 'the default region'} did not complete.", level="ERROR")
+                failures.append((service, region, "The audit did not complete."))
+                continue
+            if report_writer is None:
+                for finding in findings:
+                    merged.append({"Service": service, "Region": region or "default", **finding})
+
+    # Findings a failed audit already streamed cannot be taken back, so its
+    # section of the report is marked incomplete instead
+    if report_writer is not None:
+        for service, region, error in failures:
+            report_writer.append({"Service": service, "Region": region or "default",
+                                  "Incomplete": True, "Error": error})
+
+    if not merged:
+        log_message("All audited resources are compliant!")
+    elif report_writer is None:
+        save_report(merged, report_path)
+
+    return merged
@@ -0,0 +1,78 @@
+import time
+
+from utils import log_message
+from metrics import METRICS
+
+class Rule:
+    """
+    A single compliance check.
+
+    rule_id      -- short stable name used on the command line (--rules)
+    requires     -- names of the resource data the check reads; the checkers
+                    only fetch data that at least one enabled rule requires
+    check        -- function(resource, context) returning a list of issues
+    kb_keywords  -- words used to find the matching knowledge-base entry
+    """
+
+    def __init__(self, rule_id, requires, check, description, kb_keywords=()):
+        self.rule_id = rule_id
+        self.requires = frozenset(requires)
+        self.check = check
+        self.description = description
+        self.kb_keywords = tuple(kb_keywords)
+
+def select_rules(registry, enabled=None):
+    """
+    Returns the rules of a registry that are enabled, in registry order.
+    All rules are enabled when `enabled` is None.
+    """
+    if enabled is None:
+        return list(registry)
+    return [rule for rule in registry if rule.rule_id in enabled]
+
+def required_data(rules):
+    """
+    Returns the union of the data the given rules need.
+    """
+    required = set()
+    for rule in rules:
+        required |= rule.requires
+    return required
+
+def evaluate(rules, resources, context=None):
+    """
+    Evaluates every rule over a batch of resources, one rule at a time.
+    Returns one list of issues per resource, in rule order. A rule that
+    raises only affects its own result for that resource. The time spent
+    in each rule is recorded in METRICS.
+    """
+    context = context or {}
+    issues = [[] for _ in resources]
+    for rule in rules:
+        start = time.perf_counter()
+        for index, resource in enumerate(resources):
+            try:
+                issues[index].extend(rule.check(resource, context))
+            except Exception as e:
+                log_message(f"Rule {rule.rule_id} failed: {e}", level="ERROR")
+                issues[index].append(f"Failed to evaluate rule {rule.rule_id}.")
+        METRICS.record_rule(rule.rule_id, time.perf_counter() - start, len(resources))
+    return issues
+
+def match_kb_rules(rules, compliance_rules):
+    """
+    Links each rule to the first fetched knowledge-base entry whose title
+    contains all of its keywords, and logs rules that have no match.
+    Returns {rule_id: kb title or None}.
+    """
+    titles = [kb_rule["title"] for kb_rule in compliance_rules]
+    matches = {}
+    for rule in rules:
+        keywords = [keyword.lower() for keyword in rule.kb_keywords]
+        matches[rule.rule_id] = next(
+            (title for title in titles if keywords and all(keyword in title.lower() for keyword in keywords)),
+            None
+        )
+        if matches[rule.rule_id] is None:
+            log_message(f"Rule {rule.rule_id} has no matching knowledge-base entry.", level="WARNING")
+    return matches
@@ -1,111 +1,233 @@
-import boto3
+import json
+from concurrent.futures import ThreadPoolExecutor
+
 from utils import log_message, save_report
-from compliance_rules import fetch_compliance_rules
+from compliance_rules import fetch_compliance_rules, DEFAULT_TTL
+from aws_clients import create_client, is_throttling_error
+from s3_snapshot import BucketSnapshot
+from incremental import IncrementalState, evaluate_incrementally
+from metrics import timed
+from rule_engine import Rule, select_rules, required_data, evaluate, match_kb_rules
+from defaults import DEFAULT_WORKERS
+
+REPORT_PATH = "reports/s3_compliance_report.json"
+
+# Buckets fetched per worker before their findings are evaluated and written
+BATCH_PER_WORKER = 4
+
+# 1. Block Public Access Check
+def check_block_public_access(snapshot, context):
+    block_public_access = snapshot.get("public_access_block")
+    if block_public_access is None:
+        log_message(f"Failed to check Block Public Access settings for bucket {snapshot.bucket_name}: {snapshot.error_message('public_access_block')}", level="ERROR")
+        return ["Failed to verify Block Public Access settings."]
+    if not block_public_access.get('PublicAccessBlockConfiguration', {}).get('BlockPublicAcls', False):
+        return ["Block public access is not enabled for this bucket."]
+    return []
+
+# 2. Encryption Check
+def check_encryption(snapshot, context):
+    encryption = snapshot.get("encryption")
+    if encryption is None:
+        if snapshot.error_code("encryption") == "ServerSideEncryptionConfigurationNotFoundError":
+            return ["Bucket does not have encryption enabled"]
+        log_message(f"Failed to check encryption for bucket {snapshot.bucket_name}: {snapshot.error_message('encryption')}", level="ERROR")
+        return []
+    if "ServerSideEncryptionConfiguration" not in encryption:
+        return ["Bucket does not have encryption enabled"]
+    return []
+
+# 3. Versioning Check
+def check_versioning(snapshot, context):
+    versioning = snapshot.get("versioning")
+    if versioning is None:
+        log_message(f"Failed to check versioning for bucket {snapshot.bucket_name}: {snapshot.error_message('versioning')}", level="ERROR")
+        return ["Failed to verify versioning settings."]
+    if versioning.get("Status") != "Enabled":
+        return ["Bucket versioning is not enabled"]
+    return []
+
+# 4. Logging Check (Ensure access logging is enabled)
+def check_logging(snapshot, context):
+    logging = snapshot.get("logging")
+    if logging is None:
+        log_message(f"Failed to check logging for bucket {snapshot.bucket_name}: {snapshot.error_message('logging')}", level="ERROR")
+        return ["Failed to verify logging settings."]
+    if "LoggingEnabled" not in logging:
+        return ["Bucket logging is not enabled"]
+    return []
+
+# 5. MFA Delete Check (Ensure MFA delete is enabled)
+def check_mfa_delete(snapshot, context):
+    versioning = snapshot.get("versioning")
+    if versioning is None:
+        log_message(f"Failed to check MFA Delete for bucket {snapshot.bucket_name}: {snapshot.error_message('versioning')}", level="ERROR")
+        return ["Failed to verify MFA Delete setting."]
+    if versioning.get("MFADelete") != "Enabled":
+        return ["MFA Delete is not enabled"]
+    return []
+
+# 6. Cross-account Access Check (Only check if policy exists)
+def check_cross_account_access(snapshot, context):
+    policy = snapshot.get("policy")
+    if policy is None:
+        if snapshot.error_code("policy") == "NoSuchBucketPolicy":
+            log_message("No bucket policy found for bucket %s, skipping cross-account access check.",
+                        args=(snapshot.bucket_name,), sampled=True)
+            return []
+        log_message(f"Failed to check cross-account access for bucket {snapshot.bucket_name}: {snapshot.error_message('policy')}", level="ERROR")
+        return ["Failed to verify cross-account access settings."]
+
+    # get_bucket_policy returns the policy document as a JSON string
+    issues = []
+    for statement in json.loads(policy.get("Policy", "{}")).get("Statement", []):
+        if "Principal" in statement and "*" in statement["Principal"]:
+            issues.append("Bucket allows cross-account access")
+    return issues
+
+# Requirements are BucketSnapshot keys, so only the endpoints an enabled
+# rule reads are called
+S3_RULES = [
+    Rule("s3-block-public-access", ["public_access_block"], check_block_public_access,
+         "Block Public Access (BlockPublicAcls) is enabled", kb_keywords=["public access"]),
+    Rule("s3-encryption", ["encryption"], check_encryption,
+         "Default server-side encryption is enabled", kb_keywords=["encryption"]),
+    Rule("s3-versioning", ["versioning"], check_versioning,
+         "Versioning is enabled", kb_keywords=["versioning"]),
+    Rule("s3-logging", ["logging"], check_logging,
+         "Server access logging is enabled", kb_keywords=["logging"]),
+    Rule("s3-mfa-delete", ["versioning"], check_mfa_delete,
+         "MFA Delete is enabled", kb_keywords=["MFA"]),
+    Rule("s3-cross-account-access", ["policy"], check_cross_account_access,
+         "The bucket policy does not grant access to every principal", kb_keywords=["cross-account"]),
+]
+
+def fetch_snapshot(s3, bucket_name, keys=None):
+    """
+    Fetches the configuration snapshot for one bucket. An unexpected failure
+    is logged and returns None so one bucket cannot abort the whole audit.
+    """
+    log_message("Checking compliance for bucket: %s", args=(bucket_name,), sampled=True)
+    try:
+        return BucketSnapshot.fetch(s3, bucket_name, keys)
+    except Exception as e:
+        if is_throttling_error(e):
+            log_message(f"Bucket {bucket_name} was not checked: still throttled after retries.", level="ERROR")
+        else:
+            log_message(f"Failed to check compliance for bucket {bucket_name}: {e}", level="ERROR")
+        return None
+
+def snapshot_fingerprint_data(snapshot):
+    """
+    Returns the bucket configuration the rules depend on for incremental
+    change detection. Errors are reduced to their codes, since the messages
+    are not stable between runs.
+    """
+    return {
+        "Responses": snapshot.responses,
+        "Errors": {key: error["Code"] for key, error in snapshot.errors.items()},
+    }
+
+def evaluate_bucket(snapshot, rules=S3_RULES):
+    """
+    Evaluates the compliance rules against a bucket configuration snapshot.
+    Makes no API calls, so it works the same on a replayed snapshot.
+    """
+    return evaluate(rules, [snapshot])[0]
 
-def check_s3_compliance():
+@timed("s3_audit")
+def check_s3_compliance(workers=DEFAULT_WORKERS, rules_ttl=DEFAULT_TTL, offline=False,
+                        compliance_rules=None, report_path=REPORT_PATH, enabled_rules=None,
+                        incremental=False, report_writer=None, s3=None, rate_limit=None):
     """
     Checks S3 bucket compliance against dynamically fetched rules.
+    Buckets are checked concurrently by up to `workers` threads, in
+    batches of workers * BATCH_PER_WORKER. Rules already fetched by the
+    caller can be passed in, and report_path=None skips writing the
+    report. enabled_rules limits the audit to those rule IDs, and only the
+    S3 endpoints those rules read are called. With incremental=True only
+    buckets whose configuration changed since the previous run are
+    re-evaluated, and a diff report is written. If report_writer is given,
+    findings are appended to it as they are found and it is returned in
+    place of the list. An existing S3 client (or a local stand-in from
+    fake_aws) can be passed as s3; otherwise one is created with
+    rate_limit calls per second per API. Returns the non-compliant
+    buckets, or None if the audit could not run.
     """
-    log_message("Fetching S3 compliance rules...")
-    compliance_rules = fetch_compliance_rules("s3")
+    if compliance_rules is None:
+        log_message("Fetching S3 compliance rules...")
+        compliance_rules = fetch_compliance_rules("s3", ttl=rules_ttl, offline=offline)
 
     if not compliance_rules:
         log_message("No compliance rules available for S3. Skipping compliance checks.", level="ERROR")
-        return
+        return None
+
+    rules = select_rules(S3_RULES, enabled_rules)
+    if not rules:
+        log_message("No S3 rules enabled. Skipping compliance checks.", level="WARNING")
+        return []
+    match_kb_rules(rules, compliance_rules)
+    snapshot_keys = required_data(rules)
 
     log_message("Starting S3 compliance check...")
-    s3 = boto3.client("s3")
+    if s3 is None:
+        s3 = create_client("s3", max_pool_connections=workers, rate_limit=rate_limit)
     try:
         response = s3.list_buckets()
     except Exception as e:
         log_message(f"Failed to list S3 buckets: {e}", level="ERROR")
-        return
+        return None
 
     buckets = response.get("Buckets", [])
     log_message(f"Found {len(buckets)} S3 buckets.")
 
-    non_compliant_buckets = []
-
-    for bucket in buckets:
-        bucket_name = bucket["Name"]
-        log_message(f"Checking compliance for bucket: {bucket_name}")
-
-        bucket_issues = []
-
-        # 1. Block Public Access Check
-        try:
-            block_public_access = s3.get_public_access_block(Bucket=bucket_name)
-            block_all_public_access = block_public_access.get('PublicAccessBlockConfiguration', {}).get('BlockPublicAcls', False)
-            if not block_all_public_access:
-                bucket_issues.append("Block public access is not enabled for this bucket.")
-        except s3.exceptions.ClientError as e:
-            log_message(f"Failed to check Block Public Access settings for bucket {bucket_name}: {e}", level="ERROR")
-            bucket_issues.append("Failed to verify Block Public Access settings.")
-
-        # 2. Encryption Check
-        try:
-            encryption = s3.get_bucket_encryption(Bucket=bucket_name)
-            if "ServerSideEncryptionConfiguration" not in encryption:
-                bucket_issues.append("Bucket does not have encryption enabled")
-        except s3.exceptions.ClientError as e:
-            if "ServerSideEncryptionConfigurationNotFoundError" in str(e):
-                bucket_issues.append("Bucket does not have encryption enabled")
-            else:
-                log_message(f"Failed to check encryption for bucket {bucket_name}: {e}", level="ERROR")
-
-        # 3. Versioning Check
-        try:
-            versioning = s3.get_bucket_versioning(Bucket=bucket_name)
-            if versioning.get("Status") != "Enabled":
-                bucket_issues.append("Bucket versioning is not enabled")
-        except s3.exceptions.ClientError as e:
-            log_message(f"Failed to check versioning for bucket {bucket_name}: {e}", level="ERROR")
-            bucket_issues.append("Failed to verify versioning settings.")
-
-        # 4. Logging Check (Ensure access logging is enabled)
-        try:
-            logging = s3.get_bucket_logging(Bucket=bucket_name)
-            if "LoggingEnabled" not in logging:
-                bucket_issues.append("Bucket logging is not enabled")
-        except s3.exceptions.ClientError as e:
-            log_message(f"Failed to check logging for bucket {bucket_name}: {e}", level="ERROR")
-            bucket_issues.append("Failed to verify logging settings.")
-
-        # 5. MFA Delete Check (Ensure MFA delete is enabled)
-        try:
-            versioning = s3.get_bucket_versioning(Bucket=bucket_name)
-            if versioning.get("MFADelete") != "Enabled":
-                bucket_issues.append("MFA Delete is not enabled")
-        except s3.exceptions.ClientError as e:
-            log_message(f"Failed to check MFA Delete for bucket {bucket_name}: {e}", level="ERROR")
-            bucket_issues.append("Failed to verify MFA Delete setting.")
-
-        # 6. Cross-account Access Check (Only check if policy exists)
-        try:
-            try:
-                policy = s3.get_bucket_policy(Bucket=bucket_name)
-                if "Statement" in policy:
-                    for statement in policy["Statement"]:
-                        if "Principal" in statement and "*" in statement["Principal"]:
-                            bucket_issues.append("Bucket allows cross-account access")
-            except s3.exceptions.ClientError as e:
-                if "NoSuchBucketPolicy" in str(e):
-                    log_message(f"No bucket policy found for bucket {bucket_name}, skipping cross-account access check.", level="INFO")
-                else:
-                    raise e
-        except s3.exceptions.ClientError as e:
-            log_message(f"Failed to check cross-account access for bucket {bucket_name}: {e}", level="ERROR")
-            bucket_issues.append("Failed to verify cross-account access settings.")
-
-        # Add issues to the list if any
-        if bucket_issues:
-            non_compliant_buckets.append({
-                "BucketName": bucket_name,
-                "Issues": bucket_issues
-            })
+    bucket_names = [bucket["Name"] for bucket in buckets]
+    state = IncrementalState("s3", [rule.rule_id for rule in rules]) if incremental else None
+    non_compliant_buckets = report_writer if report_writer is not None else []
+    unchecked_buckets = []
+
+    # Buckets are fetched and evaluated in batches of BATCH_PER_WORKER per
+    # worker, so only one batch of snapshots is held in memory and findings
+    # reach report_writer while later batches are fetched
+    batch_size = workers * BATCH_PER_WORKER
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(bucket_names), batch_size):
+            batch = bucket_names[start:start + batch_size]
+            # map() keeps the snapshots in bucket order
+            snapshots = list(executor.map(lambda name: fetch_snapshot(s3, name, snapshot_keys), batch))
+
+            # Then every rule is evaluated over the fetched snapshots in one pass
+            fetched = [snapshot for snapshot in snapshots if snapshot is not None]
+            fetched_issues = iter(evaluate_incrementally(
+                state, fetched,
+                lambda snapshot: snapshot.bucket_name,
+                snapshot_fingerprint_data,
+                lambda changed: evaluate(rules, changed)
+            ))
+            for bucket_name, snapshot in zip(batch, snapshots):
+                if snapshot is None:
+                    # Could not be checked at all; that is not evidence of non-compliance
+                    unchecked_buckets.append(bucket_name)
+                    continue
+                bucket_issues = next(fetched_issues)
+                # Add issues to the list if any
+                if bucket_issues:
+                    non_compliant_buckets.append({
+                        "BucketName": bucket_name,
+                        "Issues": bucket_issues
+                    })
+
+    if unchecked_buckets:
+        log_message(f"{len(unchecked_buckets)} buckets could not be checked and are not in the report: "
+                    f"{', '.join(unchecked_buckets)}", level="ERROR")
+
+    if state:
+        state.save()
 
     # Save the compliance report
-    if non_compliant_buckets:
-        save_report(non_compliant_buckets, "reports/s3_compliance_report.json")
-    else:
+    if not non_compliant_buckets:
         log_message("All buckets are compliant!")
+    elif report_path and report_writer is None:
+        save_report(non_compliant_buckets, report_path)
+
+    return non_compliant_buckets
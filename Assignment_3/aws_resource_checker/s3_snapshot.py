@@ -0,0 +1,90 @@
+from aws_clients import call_with_backoff, is_throttling_error
+
+# Snapshot key -> S3 client method used to fetch it
+ENDPOINTS = {
+    "public_access_block": "get_public_access_block",
+    "encryption": "get_bucket_encryption",
+    "versioning": "get_bucket_versioning",
+    "logging": "get_bucket_logging",
+    "policy": "get_bucket_policy",
+    "location": "get_bucket_location",
+}
+
+class BucketSnapshot:
+    """
+    The configuration of one S3 bucket, fetched with at most one request
+    per configuration endpoint. Compliance rules evaluate against the
+    snapshot instead of calling S3 themselves, so a snapshot can also be
+    saved with to_dict() and replayed offline with from_dict().
+    """
+
+    def __init__(self, bucket_name, responses=None, errors=None):
+        self.bucket_name = bucket_name
+        self.responses = responses or {}
+        self.errors = errors or {}
+
+    @classmethod
+    def fetch(cls, s3, bucket_name, keys=None):
+        """
+        Fetches the given snapshot keys (all of ENDPOINTS by default).
+        Client errors are stored on the snapshot rather than raised, except
+        throttling that outlasts the retries: that says nothing about the
+        bucket's configuration, so it is raised instead.
+        """
+        snapshot = cls(bucket_name)
+        for key in ENDPOINTS if keys is None else keys:
+            method = getattr(s3, ENDPOINTS[key])
+            try:
+                response = call_with_backoff(method, Bucket=bucket_name)
+                response.pop("ResponseMetadata", None)
+                snapshot.responses[key] = response
+            except s3.exceptions.ClientError as e:
+                if is_throttling_error(e):
+                    raise
+                error = e.response.get("Error", {})
+                snapshot.errors[key] = {
+                    "Code": error.get("Code", ""),
+                    "Message": str(e),
+                }
+        return snapshot
+
+    def get(self, key):
+        """
+        Returns the response for a key, or None if it failed or was not fetched.
+        """
+        return self.responses.get(key)
+
+    def error_code(self, key):
+        """
+        Returns the AWS error code for a key that failed, otherwise None.
+        """
+        error = self.errors.get(key)
+        return error["Code"] if error else None
+
+    def error_message(self, key):
+        """
+        Returns the error message for a key that failed, otherwise None.
+        """
+        error = self.errors.get(key)
+        return error["Message"] if error else None
+
+    @property
+    def region(self):
+        """
+        The bucket's region; an empty LocationConstraint means us-east-1.
+        """
+        location = self.get("location")
+        if location is None:
+            return None
+        return location.get("LocationConstraint") or "us-east-1"
+
+    def to_dict(self):
+        return {
+            "BucketName": self.bucket_name,
+            "Responses": self.responses,
+            "Errors": self.errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["BucketName"], data.get("Responses"), data.get("Errors"))
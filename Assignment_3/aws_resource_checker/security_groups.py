@@ -0,0 +1,102 @@
+from utils import log_message
+from aws_clients import call_with_backoff, error_code, is_throttling_error
+
+# Maximum number of group IDs sent in a single describe_security_groups call
+CHUNK_SIZE = 200
+
+# Errors for a single bad ID, which fail a whole describe_security_groups call
+INVALID_GROUP_ERROR_CODES = {"InvalidGroup.NotFound", "InvalidGroupId.Malformed"}
+
+OPEN_IPV4 = "0.0.0.0/0"
+OPEN_IPV6 = "::/0"
+
+def summarize_security_group(sg):
+    """
+    Reduces a describe_security_groups entry to the fields the checks need,
+    with the "open to the world" flags computed once.
+    """
+    open_ipv4 = False
+    open_ipv6 = False
+    for ip_permission in sg.get("IpPermissions", []):
+        if any(ip_range.get("CidrIp") == OPEN_IPV4 for ip_range in ip_permission.get("IpRanges", [])):
+            open_ipv4 = True
+        if any(ip_range.get("CidrIpv6") == OPEN_IPV6 for ip_range in ip_permission.get("Ipv6Ranges", [])):
+            open_ipv6 = True
+
+    return {
+        "GroupId": sg["GroupId"],
+        "GroupName": sg.get("GroupName", ""),
+        "OpenIpv4": open_ipv4,
+        "OpenIpv6": open_ipv6,
+    }
+
+class SecurityGroupIndex:
+    """
+    Resolves security groups by ID for the EC2 checks.
+    Each group is fetched at most once per run, in bulk chunks.
+    """
+
+    def __init__(self, ec2, chunk_size=CHUNK_SIZE):
+        self.ec2 = ec2
+        self.chunk_size = chunk_size
+        self.groups = {}
+        self.failed = set()
+
+    def prefetch(self, group_ids):
+        """
+        Fetches every group ID not already resolved (or known to fail).
+        """
+        missing = sorted(set(group_ids) - self.groups.keys() - self.failed)
+        for start in range(0, len(missing), self.chunk_size):
+            self._fetch_chunk(missing[start:start + self.chunk_size])
+
+    def prefetch_instances(self, instances):
+        """
+        Fetches every security group attached to the given instances.
+        """
+        self.prefetch(
+            security_group["GroupId"]
+            for instance in instances
+            for security_group in instance.get("SecurityGroups", [])
+        )
+
+    def get(self, group_id):
+        """
+        Returns the summary for a group, fetching it if needed.
+        Returns None if the group could not be described.
+        """
+        if group_id not in self.groups and group_id not in self.failed:
+            self.prefetch([group_id])
+        return self.groups.get(group_id)
+
+    def _fetch_chunk(self, group_ids):
+        try:
+            response = call_with_backoff(self.ec2.describe_security_groups, GroupIds=group_ids)
+            for sg in response.get("SecurityGroups", []):
+                self.groups[sg["GroupId"]] = summarize_security_group(sg)
+        except Exception as e:
+            # Throttling that outlasted the retries is raised to the caller
+            # rather than multiplying the calls
+            if is_throttling_error(e):
+                raise
+            # Any other error except a missing or malformed ID (e.g. access
+            # denied) fails every group in the chunk the same way, so those
+            # groups are left unchecked and the instance audit carries on
+            if error_code(e) not in INVALID_GROUP_ERROR_CODES:
+                log_message(f"Failed to describe security groups {', '.join(group_ids)}: {e}", level="ERROR")
+                self.failed.update(group_ids)
+                return
+            if len(group_ids) == 1:
+                log_message(f"Failed to describe security group {group_ids[0]}: {e}", level="ERROR")
+                self.failed.add(group_ids[0])
+                return
+            # One bad ID fails the whole call, so retry the chunk one group at a time
+            log_message(f"Bulk security group lookup failed ({e}), retrying individually.", level="WARNING")
+            for group_id in group_ids:
+                if group_id not in self.groups:
+                    self._fetch_chunk([group_id])
+            return
+
+        for group_id in group_ids:
+            if group_id not in self.groups:
+                self.failed.add(group_id)
@@ -1,20 +1,104 @@
+import atexit
+import gzip
 import json
 import logging
 import os
+import queue
+import textwrap
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
 # Set up logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 
-def log_message(message, level="INFO"):
+def log_message(message, level="INFO", args=(), sampled=False):
     """
     Logs a message with the given severity level.
+    `args` are %-formatted into the message only if the record is emitted,
+    so hot paths can pass values instead of building f-strings. Per-resource
+    messages pass sampled=True so setup_logging can thin them out.
+    Any standard level name is accepted; unknown levels log as INFO.
+    """
+    levelno = logging.getLevelName(level.upper())
+    if not isinstance(levelno, int):
+        levelno = logging.INFO
+    logging.log(levelno, message, *args, extra={"sampled": sampled})
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as a single JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every N sampled records per level; unsampled records and
+    levels without a rate always pass.
     """
-    if level == "INFO":
-        logging.info(message)
-    elif level == "WARNING":
-        logging.warning(message)
-    elif level == "ERROR":
-        logging.error(message)
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.counters = {level: 0 for level in rates}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno)
+        if not rate or not getattr(record, "sampled", False):
+            return True
+        with self.lock:
+            count = self.counters[record.levelno]
+            self.counters[record.levelno] = count + 1
+        return count % rate == 0
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues records untouched; the stock QueueHandler formats the message
+    in the calling thread, which is the work this pipeline moves off the
+    audit threads. Safe because the listener runs in the same process.
+    """
+
+    def prepare(self, record):
+        return record
+
+def setup_logging(json_format=False, sample_every=None):
+    """
+    Replaces the default logging setup with a queue: audit threads only
+    enqueue records, and a background listener formats and writes them.
+    json_format writes one JSON object per line. sample_every=N keeps one
+    in N per-resource INFO messages. Returns the listener, which is also
+    stopped (flushing pending records) at exit.
+    """
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    if sample_every and sample_every > 1:
+        # Filtering before enqueueing means dropped records cost almost nothing
+        queue_handler.addFilter(SamplingFilter({logging.INFO: sample_every}))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO)
+
+    listener = QueueListener(log_queue, output)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
 
 def save_report(data, filepath):
     """
@@ -22,7 +106,7 @@ def save_report(data, filepath):
     Creates the directory if it doesn't exist.
     """
     directory = os.path.dirname(filepath)
-    if not os.path.exists(directory):
+    if directory and not os.path.exists(directory):
         os.makedirs(directory)
 
     try:
@@ -31,3 +115,116 @@ def save_report(data, filepath):
         log_message(f"Report saved to {filepath}")
     except Exception as e:
         log_message(f"Failed to save report: {e}", level="ERROR")
+
+class ReportWriter:
+    """
+    Streams findings to a JSON Lines report (gzip-compressed if the path
+    ends in .gz) as they are produced, one finding per line, instead of
+    keeping them in memory.
+
+    Findings go to "<filepath>.partial", which is renamed over filepath
+    only when the writer is closed, so readers never see a half-written
+    report and a crashed run leaves its findings so far in the partial
+    file. The writer supports append() and len() so checkers can use it
+    in place of a findings list, and is safe to share between threads.
+    """
+
+    def __init__(self, filepath, compact=False):
+        self.filepath = filepath
+        self.partial_path = filepath + ".partial"
+        self.separators = (",", ":") if compact else (", ", ": ")
+        self.count = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(filepath)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if filepath.endswith(".gz"):
+            self.file = gzip.open(self.partial_path, "wt", encoding="utf-8")
+        else:
+            # Line buffered, so every finding reaches the file as it is written
+            self.file = open(self.partial_path, "w", encoding="utf-8", buffering=1)
+
+    def append(self, finding):
+        line = json.dumps(finding, separators=self.separators)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def tagged(self, **tags):
+        """
+        Returns a view that adds the given fields to every finding appended
+        through it, e.g. the Service and Region of a merged report.
+        """
+        return TaggedReportWriter(self, tags)
+
+    def close(self):
+        """
+        Flushes the report and atomically moves it into place.
+        """
+        self.file.close()
+        os.replace(self.partial_path, self.filepath)
+        log_message(f"Report saved to {self.filepath} ({self.count} findings)")
+
+    def abort(self):
+        """
+        Closes the report without replacing the previous one; the findings
+        written so far are left in the partial file.
+        """
+        self.file.close()
+        log_message(f"Report not finalized; partial findings left in {self.partial_path}", level="WARNING")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class TaggedReportWriter:
+    """
+    A view of a ReportWriter that adds fixed fields to each finding.
+    """
+
+    def __init__(self, writer, tags):
+        self.writer = writer
+        self.tags = tags
+        self.count = 0
+
+    def append(self, finding):
+        self.writer.append({**self.tags, **finding})
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+def iter_report(filepath):
+    """
+    Yields the findings of a JSON Lines report one at a time.
+    """
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+def convert_report(source, destination):
+    """
+    Converts a JSON Lines report to the pretty-printed JSON array written by
+    save_report, streaming one finding at a time.
+    """
+    count = 0
+    with open(destination, "w") as file:
+        for finding in iter_report(source):
+            file.write("[\n" if count == 0 else ",\n")
+            file.write(textwrap.indent(json.dumps(finding, indent=4), "    "))
+            count += 1
+        file.write("\n]" if count else "[]")
+    log_message(f"Converted {count} findings from {source} to {destination}")
+    return count
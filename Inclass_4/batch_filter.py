@@ -0,0 +1,186 @@
+'''
+Date: 2026-10-18
+Description: Non-interactive batch mode for the EC2 instance filter. Reads any
+number of CPU/memory requirement rows from a CSV or JSON Lines file, loads and
+indexes ec2_instance_types.json once, and streams the matching instance types
+for every row to a JSON Lines or CSV output file as it is evaluated.
+
+Input is a CSV file, a JSON Lines file (.jsonl, one object per line) or a
+JSON file (.json) holding an array of objects. Columns (CSV header or JSON
+keys): id (optional), min_cpu, max_cpu, min_memory, max_memory. CPU bounds
+must be whole numbers. Empty or missing max values mean no maximum. Rows that cannot be read are reported
+as errors in the output and do not stop the batch.
+
+Example:
+    python batch_filter.py wave1.csv wave1_matches.jsonl --processes 4
+'''
+
+import argparse
+import csv
+import json
+import sys
+from functools import lru_cache
+from multiprocessing import Pool
+
+from instance_catalog import load_catalog
+
+# Requirements sent to a worker process at a time
+CHUNK_SIZE = 256
+
+REQUIREMENT_FIELDS = ["min_cpu", "max_cpu", "min_memory", "max_memory"]
+
+# The catalog used by evaluate_row; loaded once per process
+catalog = None
+
+def init_worker(catalog_filename):
+    # Load the catalog once in each worker process.
+    global catalog
+    catalog = load_catalog(catalog_filename)
+    matching_names.cache_clear()
+
+def read_requirements(filename):
+    # Yield the requirement rows of a CSV, JSON Lines or JSON file one at a
+    # time. A line or item that is not a JSON object is yielded as an error row.
+    with open(filename, 'r', newline='') as file:
+        if filename.endswith(".jsonl"):
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield {"id": line_number, "error": f"Invalid JSON: {e.msg}."}
+                        continue
+                    yield json_row(row, line_number)
+        elif filename.endswith(".json"):
+            rows = json.load(file)
+            for item_number, row in enumerate(rows if isinstance(rows, list) else [rows], start=1):
+                yield json_row(row, item_number)
+        else:
+            for line_number, row in enumerate(csv.DictReader(file), start=2):
+                if not row.get("id"):
+                    row["id"] = line_number
+                yield row
+
+def json_row(row, default_id):
+    # Return a requirement row read from JSON, or an error row if it is not an object.
+    if not isinstance(row, dict):
+        return {"id": default_id, "error": "Requirement is not a JSON object."}
+    row.setdefault("id", default_id)
+    return row
+
+def parse_bound(value, convert):
+    # Convert an optional bound; empty or missing means no bound. JSON
+    # true/false would otherwise convert to 1 and 0, so they are rejected.
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{value!r} is not a number")
+    return convert(value)
+
+def whole_number(value):
+    # Convert a vCPU bound, rejecting fractions rather than truncating them
+    # (1.7 is an error, "2" and 2.0 are 2).
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(number)
+
+def evaluate_row(row):
+    # Return the result record for one requirement row.
+    if "error" in row:
+        return {"id": row.get("id"), "error": row["error"]}
+    try:
+        min_cpu = parse_bound(row.get("min_cpu"), whole_number)
+        max_cpu = parse_bound(row.get("max_cpu"), whole_number)
+        min_memory = parse_bound(row.get("min_memory"), float)
+        max_memory = parse_bound(row.get("max_memory"), float)
+    except (TypeError, ValueError) as e:
+        return {"id": row.get("id"), "error": f"Invalid requirement values: {e}"}
+
+    return {
+        "id": row.get("id"),
+        "min_cpu": min_cpu,
+        "max_cpu": max_cpu,
+        "min_memory": min_memory,
+        "max_memory": max_memory,
+        "matches": matching_names(min_cpu, max_cpu, min_memory, max_memory),
+    }
+
+@lru_cache(maxsize=4096)
+def matching_names(min_cpu, max_cpu, min_memory, max_memory):
+    # Names of the matching instance types; a migration wave repeats the same
+    # few instance sizes many times, so each distinct requirement is queried once.
+    return [record.name for record in catalog.range_query(min_cpu, max_cpu, min_memory, max_memory)]
+
+class ResultWriter:
+    # Writes results as JSON Lines, or as CSV with one row per match (and
+    # one row with an empty instance type for a requirement with no matches).
+
+    def __init__(self, filename):
+        self.file = sys.stdout if filename == "-" else open(filename, 'w', newline='')
+        self.csv_writer = None
+        if filename.endswith(".csv"):
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(["id"] + REQUIREMENT_FIELDS + ["instance_type"])
+
+    def write(self, result):
+        if self.csv_writer is None:
+            self.file.write(json.dumps(result) + "\n")
+        elif "error" in result:
+            self.csv_writer.writerow([result["id"]] + [""] * len(REQUIREMENT_FIELDS) + ["ERROR: " + result["error"]])
+        else:
+            bounds = ["" if result[field] is None else result[field] for field in REQUIREMENT_FIELDS]
+            for name in result["matches"] or [""]:
+                self.csv_writer.writerow([result["id"]] + bounds + [name])
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+def run_batch(requirements_file, output_file, catalog_filename='ec2_instance_types.json', processes=1):
+    # Evaluate every requirement row and stream the results to output_file.
+    # Returns (rows evaluated, rows with errors).
+    rows = read_requirements(requirements_file)
+    writer = ResultWriter(output_file)
+    evaluated = errors = 0
+    try:
+        if processes > 1:
+            with Pool(processes, initializer=init_worker, initargs=(catalog_filename,)) as pool:
+                # imap keeps the input order while workers run ahead
+                results = pool.imap(evaluate_row, rows, chunksize=CHUNK_SIZE)
+                for result in results:
+                    writer.write(result)
+                    evaluated += 1
+                    errors += "error" in result
+        else:
+            init_worker(catalog_filename)
+            for row in rows:
+                result = evaluate_row(row)
+                writer.write(result)
+                evaluated += 1
+                errors += "error" in result
+    finally:
+        writer.close()
+    return evaluated, errors
+
+def main():
+    # Run the batch filter from the command line.
+    parser = argparse.ArgumentParser(description="Filter EC2 instance types for many requirements at once")
+    parser.add_argument("requirements", help="CSV or JSON Lines file of requirement rows")
+    parser.add_argument("output", help="Output file: .csv for one row per match, otherwise JSON Lines ('-' for stdout)")
+    parser.add_argument("--catalog", default='ec2_instance_types.json')
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes (default 1: no pool)")
+    args = parser.parse_args()
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+
+    try:
+        evaluated, errors = run_batch(args.requirements, args.output, args.catalog, args.processes)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Batch failed: {e}")
+        sys.exit(1)
+    if args.output != "-":
+        print(f"Evaluated {evaluated} requirements ({errors} invalid); results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+'''
+Date: 2026-10-18
+Description: Columnar (NumPy) view of the EC2 instance catalog for capacity
+planning sweeps. Each attribute is stored as one array, and batch_query
+evaluates thousands of CPU/memory range requirements at once with a vectorized
+mask, giving the match count and matching catalog positions of every requirement.
+
+Run directly to time a sweep of 10,000 random requirements:
+    python catalog_columns.py ../ec2_instance_types.json
+'''
+
+import sys
+import time
+
+# NumPy is only needed for this module (see requirements.txt); the rest of
+# Inclass_4 runs on the standard library
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("catalog_columns requires NumPy (pip install -r requirements.txt); "
+                      "instance_catalog.InstanceCatalog answers the same queries without it") from e
+
+from instance_catalog import load_catalog
+
+class CatalogColumns:
+    # One NumPy array per numeric catalog attribute, in catalog order.
+
+    def __init__(self, catalog):
+        self.records = catalog.records
+        self.names = np.array([record.name for record in catalog])
+        self.vcpu = np.array([record.vcpu for record in catalog], dtype=np.float64)
+        self.memory_gib = np.array([record.memory_gib for record in catalog], dtype=np.float64)
+        self.bandwidth_gbps = np.array([record.bandwidth_gbps for record in catalog], dtype=np.float64)
+        self.bandwidth_tier = np.array([record.bandwidth_tier for record in catalog], dtype=np.int8)
+        self.bandwidth_burstable = np.array([record.bandwidth_burstable for record in catalog], dtype=bool)
+        self.burst = np.array([record.burst for record in catalog], dtype=bool)
+        self.burst_minutes = np.array([record.burst_minutes for record in catalog], dtype=np.float64)
+        self.storage_gb = np.array([record.storage_gb for record in catalog], dtype=np.float64)
+        self.availability_rating = np.array([record.availability_rating for record in catalog], dtype=np.int8)
+
+        # Many instance types share a (vCPU, memory) shape, so requirements are
+        # evaluated once per distinct shape ("cell") rather than per instance
+        shapes, self.instance_cell, self.cell_sizes = np.unique(
+            np.column_stack([self.vcpu, self.memory_gib]), axis=0, return_inverse=True, return_counts=True)
+        self.instance_cell = self.instance_cell.reshape(-1)
+        self.cell_vcpu = shapes[:, 0]
+        self.cell_memory_gib = shapes[:, 1]
+
+    def __len__(self):
+        return len(self.records)
+
+    def query(self, min_cpu=None, max_cpu=None, min_memory=None, max_memory=None,
+              min_bandwidth=None, burstable=None):
+        # Return the catalog positions of the instances within the bounds.
+        # min_bandwidth is in Gbps; burstable=True keeps only burstable
+        # instances and False excludes them.
+        positions = self.batch_query([(min_cpu, max_cpu, min_memory, max_memory)])[0]
+        if min_bandwidth is not None:
+            positions = positions[self.bandwidth_gbps[positions] >= min_bandwidth]
+        if burstable is not None:
+            positions = positions[self.burst[positions] == burstable]
+        return positions
+
+    def batch_query(self, requirements):
+        # Evaluate many (min_cpu, max_cpu, min_memory, max_memory) requirements
+        # at once (None or NaN is unbounded) with one vectorized mask over
+        # requirements x cells. Returns a BatchResult.
+        bounds = requirements_array(requirements)
+        # NaN bounds compare False, so they are replaced by infinities
+        min_cpu, max_cpu, min_memory, max_memory = (
+            np.nan_to_num(bounds[:, column], nan=default)[:, None]
+            for column, default in enumerate([-np.inf, np.inf, -np.inf, np.inf])
+        )
+        cell_mask = ((self.cell_vcpu >= min_cpu) & (self.cell_vcpu <= max_cpu)
+                     & (self.cell_memory_gib >= min_memory) & (self.cell_memory_gib <= max_memory))
+        return BatchResult(self, cell_mask)
+
+    def batch_count(self, requirements):
+        # Return the number of matching instances for each requirement.
+        return self.batch_query(requirements).counts
+
+class BatchResult:
+    # The matches of a batch of requirements. Counts are computed for the
+    # whole batch at once; the matching positions of one requirement are
+    # expanded from its cell mask when it is accessed.
+
+    def __init__(self, columns, cell_mask):
+        self.columns = columns
+        self.cell_mask = cell_mask
+        self.counts = cell_mask.astype(np.int64) @ columns.cell_sizes
+
+    def __len__(self):
+        return len(self.cell_mask)
+
+    def __getitem__(self, index):
+        # Sorted catalog positions matching requirement `index`.
+        return np.flatnonzero(self.cell_mask[index][self.columns.instance_cell])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+def requirements_array(requirements):
+    # Convert requirement tuples into an (n, 4) float array with NaN for None.
+    if isinstance(requirements, np.ndarray):
+        return requirements.astype(np.float64).reshape(-1, 4)
+    return np.array([[np.nan if value is None else value for value in requirement]
+                     for requirement in requirements], dtype=np.float64).reshape(-1, 4)
+
+def random_requirements(count, seed=0):
+    # Generate a reproducible sweep of CPU and memory requirements.
+    rng = np.random.default_rng(seed)
+    min_cpu = rng.choice([1, 2, 4, 8, 16, 32, 64], count).astype(float)
+    max_cpu = np.where(rng.random(count) < 0.3, np.nan, min_cpu * rng.choice([1, 2, 4, 8], count))
+    min_memory = rng.choice([0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256], count).astype(float)
+    max_memory = np.where(rng.random(count) < 0.3, np.nan, min_memory * rng.choice([1, 2, 4, 8], count))
+    return np.column_stack([min_cpu, max_cpu, min_memory, max_memory])
+
+def main():
+    # Time a sweep of 10,000 requirements against the catalog.
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'ec2_instance_types.json'
+    columns = CatalogColumns(load_catalog(filename))
+    requirements = random_requirements(10000)
+
+    start = time.perf_counter()
+    results = columns.batch_query(requirements)
+    elapsed = time.perf_counter() - start
+    print(f"{len(requirements)} requirements x {len(columns)} instance types: "
+          f"{elapsed * 1000:.1f} ms ({results.counts.sum()} matches)")
+
+    start = time.perf_counter()
+    for positions in results:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"expanding every result to catalog positions: {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+'''
+Date: 2026-10-18
+Description: Single-pass normalization of the human-readable fields in
+ec2_instance_types.json into numbers, so instances can be filtered on
+bandwidth, burst behaviour and storage without string matching at query time.
+
+Handled formats include:
+    vcpu       "2 vCPUs", "2 vCPUs for a 1h 12m burst"
+    memory     "0.5 GiB", "512 MiB", "24 TiB"
+    bandwidth  "25 Gigabit", "Up to 12.5 Gigabit", "8x 100 Gigabit",
+               "Very Low", "Low", "Low to Moderate", "Moderate", "High"
+    storage    "EBS only", "475 GB NVMe SSD", "900 GB (2 * 450 GB NVMe SSD)"
+
+Unrecognized bandwidth and storage values are kept as "unknown" (tier -1,
+storage type "Unknown") so a new format does not stop the catalog loading;
+an entry without a readable vCPU count or memory size raises ValueError.
+'''
+
+import re
+
+VCPU_PATTERN = re.compile(r"([\d.]+)\s*vCPUs?", re.IGNORECASE)
+BURST_PATTERN = re.compile(r"burst", re.IGNORECASE)
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([hm])", re.IGNORECASE)
+SIZE_PATTERN = re.compile(r"([\d.]+)\s*(MiB|GiB|TiB)", re.IGNORECASE)
+BANDWIDTH_PATTERN = re.compile(r"^(Up to\s+)?(?:(\d+)\s*x\s+)?([\d.]+)\s*(Megabit|Gigabit)", re.IGNORECASE)
+STORAGE_PATTERN = re.compile(r"^([\d.]+)\s*(GB|TB)(?:\s*\((\d+)\s*\*\s*[\d.]+\s*(?:GB|TB)\s*(.*)\)|\s*(.*))$")
+
+# Splits an instance family such as "m5d" or "u-6tb1" into its series and generation
+FAMILY_PATTERN = re.compile(r"^(u-\d+tb|[a-z]+?)(\d+)")
+
+GIB_PER_UNIT = {"mib": 1 / 1024, "gib": 1.0, "tib": 1024.0}
+
+# Ordinal network tiers: the qualitative ratings of older instance types,
+# then every numeric rating above them
+BANDWIDTH_TIERS = {
+    "very low": 0,
+    "low": 1,
+    "low to moderate": 2,
+    "moderate": 3,
+    "high": 4,
+}
+NUMERIC_BANDWIDTH_TIER = 5
+UNKNOWN_BANDWIDTH_TIER = -1
+
+UNKNOWN_STORAGE_TYPE = "Unknown"
+
+# Approximate Gbps of the qualitative tiers, so they can be compared with
+# numeric ratings; records marked bandwidth_estimated use these values
+QUALITATIVE_BANDWIDTH_GBPS = {
+    0: 0.05,
+    1: 0.1,
+    2: 0.3,
+    3: 0.5,
+    4: 1.0,
+}
+
+AVAILABILITY_RATINGS = {
+    "poor": 0,
+    "moderate": 1,
+    "good": 2,
+    "very good": 3,
+}
+
+def parse_vcpu_count(vcpu_string):
+    # Return only the vCPU count of a vCPU string, for scans that do not
+    # need the burst details parsed by parse_vcpu.
+    match = VCPU_PATTERN.search(vcpu_string)
+    if match is None:
+        raise ValueError(f"No vCPU count in {vcpu_string!r}")
+    count = float(match.group(1))
+    return int(count) if count.is_integer() else count
+
+def parse_vcpu(vcpu_string):
+    # Return (vCPU count, burstable, burst minutes) for a vCPU string.
+    # Fractional counts are kept as floats; whole counts are ints. Burst
+    # minutes may be fractional ("4h 4.8m" is 244.8).
+    match = VCPU_PATTERN.search(vcpu_string)
+    if match is None:
+        raise ValueError(f"No vCPU count in {vcpu_string!r}")
+    count = float(match.group(1))
+    count = int(count) if count.is_integer() else count
+
+    burst = bool(BURST_PATTERN.search(vcpu_string))
+    burst_minutes = 0.0
+    if burst:
+        for amount, unit in DURATION_PATTERN.findall(vcpu_string[match.end():]):
+            burst_minutes += float(amount) * (60 if unit.lower() == "h" else 1)
+    return count, burst, burst_minutes
+
+def parse_memory_gib(memory_string):
+    # Return the memory size in GiB.
+    match = SIZE_PATTERN.search(memory_string)
+    if match is None:
+        raise ValueError(f"No memory size in {memory_string!r}")
+    return float(match.group(1)) * GIB_PER_UNIT[match.group(2).lower()]
+
+def parse_bandwidth(bandwidth_string):
+    # Return a dict of numeric bandwidth fields:
+    #   bandwidth_gbps       aggregate (Nx links) or peak Gbps; estimated for qualitative tiers
+    #   bandwidth_links      number of network links (8 for "8x 100 Gigabit")
+    #   bandwidth_burstable  True for "Up to" ratings, which are a peak rather than a baseline
+    #   bandwidth_estimated  True when bandwidth_gbps comes from a qualitative tier
+    #   bandwidth_tier       ordinal tier (see BANDWIDTH_TIERS), UNKNOWN_BANDWIDTH_TIER
+    #                        (with 0 Gbps, estimated) for an unrecognized value
+    text = bandwidth_string.strip()
+    tier = BANDWIDTH_TIERS.get(text.lower())
+    if tier is not None:
+        return {
+            "bandwidth_gbps": QUALITATIVE_BANDWIDTH_GBPS[tier],
+            "bandwidth_links": 1,
+            "bandwidth_burstable": False,
+            "bandwidth_estimated": True,
+            "bandwidth_tier": tier,
+        }
+
+    match = BANDWIDTH_PATTERN.match(text)
+    if match is None:
+        return {
+            "bandwidth_gbps": 0.0,
+            "bandwidth_links": 1,
+            "bandwidth_burstable": False,
+            "bandwidth_estimated": True,
+            "bandwidth_tier": UNKNOWN_BANDWIDTH_TIER,
+        }
+    links = int(match.group(2) or 1)
+    per_link = float(match.group(3)) / (1000 if match.group(4).lower() == "megabit" else 1)
+    return {
+        "bandwidth_gbps": links * per_link,
+        "bandwidth_links": links,
+        "bandwidth_burstable": bool(match.group(1)),
+        "bandwidth_estimated": False,
+        "bandwidth_tier": NUMERIC_BANDWIDTH_TIER,
+    }
+
+def parse_storage(storage_string):
+    # Return (instance storage GB, number of disks, disk type); EBS-only
+    # instances have (0, 0, "EBS only") and unrecognized values (0, 0, "Unknown").
+    text = storage_string.strip()
+    if text.lower() == "ebs only":
+        return 0.0, 0, "EBS only"
+    match = STORAGE_PATTERN.match(text)
+    if match is None:
+        return 0.0, 0, UNKNOWN_STORAGE_TYPE
+    size = float(match.group(1)) * (1000 if match.group(2) == "TB" else 1)
+    disks = int(match.group(3) or 1)
+    disk_type = (match.group(4) or match.group(5) or "").strip()
+    return size, disks, disk_type
+
+def parse_family(name):
+    # Split an instance name into its family, series and generation.
+    family = name.split(".")[0]
+    match = FAMILY_PATTERN.match(family)
+    if match is None:
+        return family, family, None
+    return family, match.group(1), int(match.group(2))
+
+def normalize_entry(entry):
+    # Parse every field of one catalog entry in a single pass and return
+    # the numeric values as a dict.
+    vcpu, burst, burst_minutes = parse_vcpu(entry['vcpu'])
+    storage_gb, storage_disks, storage_type = parse_storage(entry['storage'])
+    family, series, generation = parse_family(entry['name'])
+    normalized = {
+        "vcpu": vcpu,
+        "burst": burst,
+        "burst_minutes": burst_minutes,
+        "memory_gib": parse_memory_gib(entry['memory']),
+        "storage_gb": storage_gb,
+        "storage_disks": storage_disks,
+        "storage_type": storage_type,
+        "family": family,
+        "series": series,
+        "generation": generation,
+        "availability_rating": AVAILABILITY_RATINGS.get(entry['availability'].strip().lower(), -1),
+    }
+    normalized.update(parse_bandwidth(entry['bandwidth']))
+    return normalized
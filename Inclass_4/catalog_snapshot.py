@@ -0,0 +1,265 @@
+'''
+Date: 2026-10-18
+Description: Compiles ec2_instance_types.json into a compact binary snapshot and
+loads it with mmap, so the catalog can be queried without json.load or any
+string parsing at start-up. The snapshot holds fixed-width numeric columns,
+the sorted vCPU and memory indexes, and an interned string table; it is
+rebuilt automatically whenever the JSON source is newer.
+
+Example:
+    python catalog_snapshot.py ../ec2_instance_types.json
+'''
+
+import json
+import mmap
+import os
+import struct
+import sys
+import warnings
+from array import array
+
+from instance_catalog import InstanceCatalog, InstanceRecord, load_catalog
+
+MAGIC = b"EC2CATLG"
+VERSION = 4
+
+# Column name and array typecode, in file order. String columns hold an
+# index into the string table; a generation of -1 means none.
+COLUMNS = [
+    ("vcpu", "d"),
+    ("memory_gib", "d"),
+    ("bandwidth_gbps", "d"),
+    ("burst", "B"),
+    ("generation", "h"),
+    ("position", "I"),
+    ("burst_minutes", "d"),
+    ("bandwidth_links", "H"),
+    ("bandwidth_burstable", "B"),
+    ("bandwidth_estimated", "B"),
+    ("bandwidth_tier", "b"),
+    ("storage_gb", "d"),
+    ("storage_disks", "H"),
+    ("availability_rating", "b"),
+    ("name", "I"),
+    ("family", "I"),
+    ("series", "I"),
+    ("storage", "I"),
+    ("bandwidth", "I"),
+    ("availability", "I"),
+    ("storage_type", "I"),
+    ("vcpu_string", "I"),
+    ("memory_string", "I"),
+    ("by_vcpu", "I"),
+    ("vcpu_keys", "d"),
+    ("by_memory", "I"),
+    ("memory_keys", "d"),
+    ("string_offsets", "Q"),
+    ("strings", "B"),
+]
+
+STRING_COLUMNS = ["name", "family", "series", "storage", "bandwidth", "availability", "storage_type",
+                  "vcpu_string", "memory_string"]
+
+# Numeric columns copied from the records as they are
+VALUE_COLUMNS = ["position", "vcpu", "memory_gib", "bandwidth_gbps", "burst", "burst_minutes", "bandwidth_links",
+                 "bandwidth_burstable", "bandwidth_estimated", "bandwidth_tier", "storage_gb",
+                 "storage_disks", "availability_rating"]
+
+# Columns that are not one value per record
+UNSIZED_COLUMNS = ["string_offsets", "strings"]
+
+# magic, version, byte order, record count, then (offset, length) per column
+HEADER = struct.Struct("<8sHHI" + "QQ" * len(COLUMNS))
+
+def snapshot_path_for(json_path):
+    # Default snapshot location next to the JSON catalog.
+    return os.path.splitext(json_path)[0] + ".snapshot"
+
+def compile_snapshot(catalog, snapshot_path):
+    # Write the catalog to snapshot_path as a binary snapshot (atomically).
+    strings = {}
+
+    def intern(value):
+        return strings.setdefault(value, len(strings))
+
+    records = catalog.records
+    typecodes = dict(COLUMNS)
+    columns = {
+        "generation": array("h", (-1 if record.generation is None else record.generation for record in records)),
+        "by_vcpu": array("I", catalog.by_vcpu),
+        "vcpu_keys": array("d", catalog.vcpu_keys),
+        "by_memory": array("I", catalog.by_memory),
+        "memory_keys": array("d", catalog.memory_keys),
+    }
+    for column in VALUE_COLUMNS:
+        columns[column] = array(typecodes[column], (getattr(record, column) for record in records))
+    for column in STRING_COLUMNS:
+        columns[column] = array("I", (intern(getattr(record, column)) for record in records))
+
+    blob = bytearray()
+    offsets = array("Q", [0])
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    columns["string_offsets"] = offsets
+    columns["strings"] = array("B", blob)
+
+    # Every column starts on an 8-byte boundary so it can be cast in place
+    sections = []
+    position = HEADER.size
+    for name, _ in COLUMNS:
+        position += -position % 8
+        data = columns[name].tobytes()
+        sections.append((position, data))
+        position += len(data)
+
+    temp_path = snapshot_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            locations = []
+            for offset, data in sections:
+                locations.extend([offset, len(data)])
+            file.write(HEADER.pack(MAGIC, VERSION, byte_order_code(), len(records), *locations))
+            for offset, data in sections:
+                file.write(b"\0" * (offset - file.tell()))
+                file.write(data)
+        os.replace(temp_path, snapshot_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def check_header(header, size, snapshot_path):
+    # Raise ValueError unless the header is for this snapshot version and
+    # byte order and every column lies within the file with a whole number
+    # of values (one per record for the record and index columns).
+    magic, version, byte_order, count = header[:4]
+    if magic != MAGIC or version != VERSION or byte_order != byte_order_code():
+        raise ValueError(f"{snapshot_path} is not a version {VERSION} catalog snapshot")
+    for (name, typecode), offset, length in zip(COLUMNS, header[4::2], header[5::2]):
+        itemsize = array(typecode).itemsize
+        if (offset < HEADER.size or offset + length > size or length % itemsize
+                or (name not in UNSIZED_COLUMNS and length != count * itemsize)):
+            raise ValueError(f"{snapshot_path} is truncated or corrupt (column {name})")
+
+def byte_order_code():
+    # Columns are written in native byte order; a snapshot from another
+    # byte order is rebuilt rather than read.
+    return 1 if sys.byteorder == "little" else 2
+
+class SnapshotRecords:
+    # Sequence of InstanceRecords built on access from the mapped columns.
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        columns = self.snapshot.columns
+        string = self.snapshot.string
+        generation = columns["generation"][index]
+        vcpu = columns["vcpu"][index]
+        return InstanceRecord(
+            name=string(columns["name"][index]),
+            vcpu=int(vcpu) if vcpu.is_integer() else vcpu,
+            memory_gib=columns["memory_gib"][index],
+            bandwidth_gbps=columns["bandwidth_gbps"][index],
+            burst=bool(columns["burst"][index]),
+            family=string(columns["family"][index]),
+            series=string(columns["series"][index]),
+            generation=None if generation < 0 else generation,
+            storage=string(columns["storage"][index]),
+            bandwidth=string(columns["bandwidth"][index]),
+            availability=string(columns["availability"][index]),
+            position=columns["position"][index],
+            burst_minutes=columns["burst_minutes"][index],
+            bandwidth_links=columns["bandwidth_links"][index],
+            bandwidth_burstable=bool(columns["bandwidth_burstable"][index]),
+            bandwidth_estimated=bool(columns["bandwidth_estimated"][index]),
+            bandwidth_tier=columns["bandwidth_tier"][index],
+            storage_gb=columns["storage_gb"][index],
+            storage_disks=columns["storage_disks"][index],
+            storage_type=string(columns["storage_type"][index]),
+            availability_rating=columns["availability_rating"][index],
+            vcpu_string=string(columns["vcpu_string"][index]),
+            memory_string=string(columns["memory_string"][index]),
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+class SnapshotCatalog(InstanceCatalog):
+    # An InstanceCatalog served from a memory-mapped snapshot. Columns and
+    # indexes are memoryviews over the mapping, so nothing is parsed on load.
+
+    def __init__(self, snapshot_path):
+        with open(snapshot_path, "rb") as file:
+            self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # The header is checked before any column is mapped, so a bad
+        # snapshot is rejected with ValueError instead of failing in cast()
+        try:
+            header = HEADER.unpack_from(self.mapping)
+            check_header(header, len(self.mapping), snapshot_path)
+        except (ValueError, struct.error):
+            self.mapping.close()
+            raise
+        self.count = header[3]
+
+        view = memoryview(self.mapping)
+        self.columns = {}
+        for (name, typecode), offset, length in zip(COLUMNS, header[4::2], header[5::2]):
+            self.columns[name] = view[offset:offset + length].cast(typecode)
+
+        self.records = SnapshotRecords(self)
+        self.vcpu_values = self.columns["vcpu"]
+        self.memory_values = self.columns["memory_gib"]
+        self.bandwidth_values = self.columns["bandwidth_gbps"]
+        self.burst_values = self.columns["burst"]
+        self.by_vcpu = self.columns["by_vcpu"]
+        self.vcpu_keys = self.columns["vcpu_keys"]
+        self.by_memory = self.columns["by_memory"]
+        self.memory_keys = self.columns["memory_keys"]
+        self.max_bandwidth_gbps = max(self.bandwidth_values, default=0)
+
+    def string(self, index):
+        offsets = self.columns["string_offsets"]
+        return bytes(self.columns["strings"][offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+def compile_json(json_path, snapshot_path):
+    # Parse the JSON catalog and compile it to snapshot_path.
+    with open(json_path, 'r') as file:
+        compile_snapshot(InstanceCatalog.from_entries(json.load(file)), snapshot_path)
+
+def load_snapshot_catalog(json_path, snapshot_path=None):
+    # Load the catalog from its snapshot, first (re)compiling the snapshot
+    # from the JSON file if it is missing, unreadable or older than the JSON.
+    # If the snapshot cannot be written or read (e.g. a read-only checkout),
+    # the catalog is loaded from the JSON file instead.
+    snapshot_path = snapshot_path or snapshot_path_for(json_path)
+    try:
+        if not os.path.exists(snapshot_path) or os.path.getmtime(snapshot_path) < os.path.getmtime(json_path):
+            compile_json(json_path, snapshot_path)
+        try:
+            return SnapshotCatalog(snapshot_path)
+        except (ValueError, struct.error):
+            compile_json(json_path, snapshot_path)
+            return SnapshotCatalog(snapshot_path)
+    except (OSError, ValueError, struct.error) as e:
+        warnings.warn(f"Catalog snapshot {snapshot_path} is unavailable ({e}); loading {json_path} instead")
+        return load_catalog(json_path)
+
+def main():
+    # Compile the snapshot for a JSON catalog and report its size.
+    json_path = sys.argv[1] if len(sys.argv) > 1 else 'ec2_instance_types.json'
+    snapshot_path = snapshot_path_for(json_path)
+    compile_json(json_path, snapshot_path)
+    catalog = SnapshotCatalog(snapshot_path)
+    print(f"Wrote {len(catalog)} instance types to {snapshot_path} "
+          f"({os.path.getsize(snapshot_path)} bytes, JSON {os.path.getsize(json_path)} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,11 @@ instances from a JSON file in a user-friendly format.
 '''
 
 import json
+import warnings
+
+from instance_catalog import InstanceCatalog, in_range
+from catalog_normalizer import parse_memory_gib, parse_vcpu_count
+from catalog_snapshot import load_snapshot_catalog
 
 def get_valid_cpu_requirements():
     # Prompt the user for minimum and maximum CPU cores.
@@ -38,29 +43,44 @@ def load_ec2_instances(filename):
     with open(filename, 'r') as file:
         return json.load(file)
 
+def load_instance_catalog(filename):
+    # Load EC2 instance types, parsed and indexed, from the binary snapshot
+    # of the JSON file (rebuilt first if the JSON file is newer).
+    return load_snapshot_catalog(filename)
+
 def extract_vcpu_count(vcpu_string):
-    # Extract and return the numeric vCPU count from the vCPU string.
-    return int(vcpu_string.split()[0])
+    # Extract and return the numeric vCPU count from the vCPU string,
+    # e.g. 2 for "2 vCPUs for a 1h 12m burst".
+    return parse_vcpu_count(vcpu_string)
 
 def extract_memory_value(memory_string):
-    # Extract and return the numeric memory value from the memory string.
-    return float(memory_string.split()[0])
+    # Extract and return the memory in GiB from the memory string,
+    # converting "512 MiB" and "24 TiB" style values.
+    return parse_memory_gib(memory_string)
 
 def filter_instances(ec2_instances, min_cpu, max_cpu, min_memory, max_memory):
     # Filter EC2 instances based on user-defined CPU and memory requirements.
+    # A catalog is queried through its sorted indexes. A list of JSON entries
+    # is scanned once, since building the indexes for a single query costs
+    # more than the scan; entries that cannot be parsed are skipped with a
+    # warning, as in the catalog. Either way the result is a list of entry
+    # dicts in file order.
+    if isinstance(ec2_instances, InstanceCatalog):
+        matches = ec2_instances.range_query(min_cpu, max_cpu, min_memory, max_memory)
+        return [record.entry() for record in matches]
+
     filtered_instances = []
-    
-    for instance in ec2_instances:
-        cpu_cores = extract_vcpu_count(instance['vcpu'])
-        memory = extract_memory_value(instance['memory'])
-        
+    for position, instance in enumerate(ec2_instances):
+        try:
+            cpu_cores = extract_vcpu_count(instance['vcpu'])
+            memory = extract_memory_value(instance['memory'])
+        except (KeyError, TypeError, ValueError) as e:
+            warnings.warn(f"Skipping catalog entry {position} ({instance!r}): {e}")
+            continue
+
         # Check if the instance meets the CPU and memory criteria
-        cpu_criteria = cpu_cores >= min_cpu and (max_cpu is None or cpu_cores <= max_cpu)
-        memory_criteria = memory >= min_memory and (max_memory is None or memory <= max_memory)
-        
-        if cpu_criteria and memory_criteria:
+        if in_range(cpu_cores, min_cpu, max_cpu) and in_range(memory, min_memory, max_memory):
             filtered_instances.append(instance)
-    
     return filtered_instances
 
 def display_instances(instances):
@@ -86,8 +106,8 @@ def main():
     # Step 2: Get memory requirements
     min_memory, max_memory = get_valid_memory_requirements()
     
-    # Step 3: Load EC2 instances from JSON file
-    ec2_instances = load_ec2_instances('ec2_instance_types.json')
+    # Step 3: Load and index EC2 instances from JSON file
+    ec2_instances = load_instance_catalog('ec2_instance_types.json')
     
     # Step 4: Filter instances based on requirements
     filtered_instances = filter_instances(ec2_instances, min_cpu, max_cpu, min_memory, max_memory)
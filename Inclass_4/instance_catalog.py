@@ -0,0 +1,140 @@
+'''
+Date: 2026-10-18
+Description: Loads the EC2 instance type catalog (ec2_instance_types.json) once,
+normalizing every entry (see catalog_normalizer) into a typed record with
+numeric vCPU, memory, bandwidth, burst and storage values, and builds sorted
+indexes so CPU and memory range queries are answered by bisection instead of
+re-parsing and scanning every entry.
+'''
+
+import json
+import warnings
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple, Optional, Union
+
+from catalog_normalizer import normalize_entry
+
+class InstanceRecord(NamedTuple):
+    name: str
+    vcpu: Union[int, float]
+    memory_gib: float
+    bandwidth_gbps: float             # aggregate or peak Gbps (estimated for qualitative tiers)
+    burst: bool                       # True for burstable (credit based) vCPUs
+    family: str                       # "m5d" for "m5d.large"
+    series: str                       # "m" for "m5d.large"
+    generation: Optional[int]         # 5 for "m5d.large"
+    storage: str
+    bandwidth: str
+    availability: str
+    position: int                     # index in the source file
+    burst_minutes: float              # 72.0 for "2 vCPUs for a 1h 12m burst"
+    bandwidth_links: int              # 8 for "8x 100 Gigabit"
+    bandwidth_burstable: bool         # True for "Up to 5 Gigabit"
+    bandwidth_estimated: bool         # True for qualitative ratings such as "Moderate"
+    bandwidth_tier: int               # see catalog_normalizer.BANDWIDTH_TIERS; -1 if unknown
+    storage_gb: float                 # 0 for "EBS only"
+    storage_disks: int
+    storage_type: str                 # "NVMe SSD", "HDD", "EBS only", ..., "Unknown"
+    availability_rating: int          # 0 (Poor) to 3 (Very Good), -1 if unknown
+    vcpu_string: str                  # the source vCPU and memory strings
+    memory_string: str
+
+    def entry(self):
+        # The record as a catalog entry dict, as in the JSON file.
+        return {
+            "name": self.name,
+            "vcpu": self.vcpu_string,
+            "memory": self.memory_string,
+            "storage": self.storage,
+            "bandwidth": self.bandwidth,
+            "availability": self.availability,
+        }
+
+def normalize_instance(entry, position):
+    # Parse one catalog entry into an InstanceRecord.
+    return InstanceRecord(
+        name=entry['name'],
+        storage=entry['storage'],
+        bandwidth=entry['bandwidth'],
+        availability=entry['availability'],
+        position=position,
+        vcpu_string=entry['vcpu'],
+        memory_string=entry['memory'],
+        **normalize_entry(entry),
+    )
+
+class InstanceCatalog:
+    # Typed instance records with sorted vCPU and memory indexes.
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.vcpu_values = [record.vcpu for record in self.records]
+        self.memory_values = [record.memory_gib for record in self.records]
+        self.bandwidth_values = [record.bandwidth_gbps for record in self.records]
+        self.burst_values = [record.burst for record in self.records]
+
+        # Each index is a list of record positions sorted by the attribute,
+        # with the sorted attribute values alongside for bisection
+        self.by_vcpu = sorted(range(len(self.records)), key=self.vcpu_values.__getitem__)
+        self.vcpu_keys = [self.vcpu_values[i] for i in self.by_vcpu]
+        self.by_memory = sorted(range(len(self.records)), key=self.memory_values.__getitem__)
+        self.memory_keys = [self.memory_values[i] for i in self.by_memory]
+        self.max_bandwidth_gbps = max(self.bandwidth_values, default=0)
+
+    @classmethod
+    def from_entries(cls, entries):
+        # Build a catalog from the raw JSON entries. An entry that cannot be
+        # parsed is skipped with a warning rather than failing the whole catalog.
+        records = []
+        for position, entry in enumerate(entries):
+            try:
+                records.append(normalize_instance(entry, position))
+            except (KeyError, TypeError, ValueError) as e:
+                warnings.warn(f"Skipping catalog entry {position} ({entry!r}): {e}")
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def range_query(self, min_cpu=None, max_cpu=None, min_memory=None, max_memory=None,
+                    min_bandwidth=None, burstable=None):
+        # Return the records within the bounds, in file order.
+        matches = self.iter_range(min_cpu, max_cpu, min_memory, max_memory, min_bandwidth, burstable)
+        return sorted(matches, key=lambda record: record.position)
+
+    def iter_range(self, min_cpu=None, max_cpu=None, min_memory=None, max_memory=None,
+                   min_bandwidth=None, burstable=None):
+        # Yield the records within the CPU and memory bounds, in index order.
+        # min_bandwidth is in Gbps; burstable=True keeps only burstable
+        # instances and False excludes them. Both indexes are bisected; only
+        # the narrower of the two candidate ranges is scanned for the rest.
+        cpu_start, cpu_end = bounds(self.vcpu_keys, min_cpu, max_cpu)
+        memory_start, memory_end = bounds(self.memory_keys, min_memory, max_memory)
+
+        if cpu_end - cpu_start <= memory_end - memory_start:
+            candidates = (self.by_vcpu[k] for k in range(cpu_start, cpu_end))
+        else:
+            candidates = (self.by_memory[k] for k in range(memory_start, memory_end))
+        for i in candidates:
+            if (in_range(self.vcpu_values[i], min_cpu, max_cpu)
+                    and in_range(self.memory_values[i], min_memory, max_memory)
+                    and (min_bandwidth is None or self.bandwidth_values[i] >= min_bandwidth)
+                    and (burstable is None or bool(self.burst_values[i]) == burstable)):
+                yield self.records[i]
+
+def bounds(keys, minimum, maximum):
+    # Return the slice of sorted keys within [minimum, maximum] (None is unbounded).
+    start = 0 if minimum is None else bisect_left(keys, minimum)
+    end = len(keys) if maximum is None else bisect_right(keys, maximum)
+    return start, max(start, end)
+
+def in_range(value, minimum, maximum):
+    return (minimum is None or value >= minimum) and (maximum is None or value <= maximum)
+
+def load_catalog(filename):
+    # Load and index the EC2 instance catalog from a JSON file.
+    with open(filename, 'r') as file:
+        return InstanceCatalog.from_entries(json.load(file))
@@ -0,0 +1,103 @@
+'''
+Date: 2026-10-18
+Description: Recommends EC2 instance types for a sizing request. Every instance
+that satisfies the CPU and memory bounds is scored on how closely it fits the
+request, how close its memory-per-vCPU ratio is to the requested one, its
+network bandwidth and its availability rating, and the k best are returned.
+Candidates are streamed from the catalog's sorted indexes into a bounded
+heap, so the full matching set is never built or sorted.
+
+Example:
+    python recommend.py --min-cpu 4 --min-memory 16 --top 5
+'''
+
+import argparse
+import heapq
+import math
+
+from instance_catalog import load_catalog
+
+# Relative importance of each objective. Fit and ratio are measured in
+# doublings, bandwidth and availability on a 0..1 scale
+DEFAULT_WEIGHTS = {
+    "fit": 1.0,           # smallest instance that satisfies the request
+    "ratio": 0.5,         # memory per vCPU close to the requested ratio
+    "bandwidth": 0.25,    # more network bandwidth
+    "availability": 0.25, # better availability rating
+}
+
+def score_instance(record, min_cpu, min_memory, target_ratio, max_bandwidth_gbps, weights):
+    # Return the weighted score of an instance for a request; lower is better.
+    # Oversizing is measured in doublings, so 2x the requested vCPUs costs as
+    # much as 2x the requested memory.
+    fit = (math.log2(record.vcpu / max(min_cpu or 1, 1))
+           + math.log2(record.memory_gib / max(min_memory or 0.5, 0.5)))
+
+    ratio = 0.0
+    if target_ratio:
+        ratio = abs(math.log2(record.memory_gib / record.vcpu / target_ratio))
+
+    bandwidth = 0.0
+    if max_bandwidth_gbps:
+        bandwidth = math.log2(1 + record.bandwidth_gbps) / math.log2(1 + max_bandwidth_gbps)
+
+    # Ratings run from 0 (Poor) to 3 (Very Good); unknown ratings score 0
+    availability = max(record.availability_rating, 0) / 3
+
+    return (weights["fit"] * fit
+            + weights["ratio"] * ratio
+            - weights["bandwidth"] * bandwidth
+            - weights["availability"] * availability)
+
+def recommend(catalog, min_cpu=None, max_cpu=None, min_memory=None, max_memory=None,
+              top_k=5, target_ratio=None, weights=None):
+    # Return up to top_k (score, record) pairs for the request, best first.
+    # target_ratio is the wanted GiB per vCPU; by default it is taken from
+    # the minimum memory and CPU when both are given.
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    if target_ratio is None and min_cpu and min_memory:
+        target_ratio = min_memory / min_cpu
+
+    scored = (
+        (score_instance(record, min_cpu, min_memory, target_ratio, catalog.max_bandwidth_gbps, weights),
+         record.position, record)
+        for record in catalog.iter_range(min_cpu, max_cpu, min_memory, max_memory)
+    )
+    # nsmallest keeps a heap of top_k entries; position breaks score ties
+    return [(score, record) for score, _, record in heapq.nsmallest(top_k, scored)]
+
+def display_recommendations(recommendations):
+    # Display the recommended instance types, best first.
+    if not recommendations:
+        print("No EC2 instance types found matching your requirements.")
+        return
+    print("\nRecommended EC2 Instance Types:\n" + "-" * 30)
+    for rank, (score, record) in enumerate(recommendations, start=1):
+        print(f"{rank}. {record.name} (score {score:.2f})")
+        print(f" - vCPUs: {record.vcpu}")
+        print(f" - Memory: {record.memory_gib} GiB")
+        print(f" - Bandwidth: {record.bandwidth}")
+        print(f" - Availability: {record.availability}")
+        print("-" * 30)
+
+def main():
+    # Recommend instance types for a sizing request given on the command line.
+    parser = argparse.ArgumentParser(description="Recommend EC2 instance types for a sizing request")
+    parser.add_argument("--min-cpu", type=int)
+    parser.add_argument("--max-cpu", type=int)
+    parser.add_argument("--min-memory", type=float, help="GiB")
+    parser.add_argument("--max-memory", type=float, help="GiB")
+    parser.add_argument("--ratio", type=float, help="Wanted GiB of memory per vCPU")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--catalog", default="ec2_instance_types.json")
+    for objective in DEFAULT_WEIGHTS:
+        parser.add_argument(f"--{objective}-weight", type=float, default=DEFAULT_WEIGHTS[objective])
+    args = parser.parse_args()
+
+    weights = {objective: getattr(args, f"{objective}_weight") for objective in DEFAULT_WEIGHTS}
+    catalog = load_catalog(args.catalog)
+    display_recommendations(recommend(catalog, args.min_cpu, args.max_cpu, args.min_memory, args.max_memory,
+                                      top_k=args.top, target_ratio=args.ratio, weights=weights))
+
+if __name__ == "__main__":
+    main()